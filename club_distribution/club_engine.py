@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+# Club distribution in the knockout bracket, shared by the club distribution checks.
+# Every group winner goes to a fixed position of the 16-player bracket, the position
+# gives the half (8 positions) and the quarter (4 positions).
+# One pass over integer codes counts the players per (File, Club) and half/quarter;
+# all conflict definitions are array expressions on these counts.
+
+# Mapping: Groups -> Position in 16-player knockout bracket
+# Numbers which are not included are empty places in the main draw
+GROUP_TO_POS = {
+    'A': 1, 'B': 16, 'C': 12, 'D': 5,
+    'E': 7, 'F': 10, 'G': 3, 'H': 14,
+    'I': 9, 'J': 8, 'K': 13
+}
+
+# section -> (positions per section, labels)
+SECTIONS = {
+    'half': (8, np.array(['top', 'bottom'])),
+    'quarter': (4, np.array(['Q1', 'Q2', 'Q3', 'Q4'])),
+}
+TYPE_NAMES = {'half': 'Half', 'quarter': 'Quarter'}
+
+
+def section_lookup(groups, group_to_pos=GROUP_TO_POS):
+    """{section: array group index -> section index (-1 = no position)}"""
+    pos = np.array([group_to_pos.get(g, 0) for g in groups], dtype=np.int64)
+    valid = (pos >= 1) & (pos <= 16)
+    return {name: np.where(valid, (pos - 1) // size, -1) for name, (size, _) in SECTIONS.items()}
+
+
+class ClubSections:
+    """Players per (File, Club) and half/quarter.
+
+    keys: int array (File code * n_clubs + Club code) per player, group_codes: group index per player."""
+
+    def __init__(self, keys, group_codes, files, clubs, groups, group_to_pos=GROUP_TO_POS, named=None):
+        self.files = files
+        self.clubs = clubs
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+        n_keys = len(self.keys)
+        self.total = np.bincount(inverse, minlength=n_keys)
+        self.player_count = self.total if named is None else np.bincount(inverse, weights=named,
+                                                                         minlength=n_keys).astype(int)
+        lookup = section_lookup(groups, group_to_pos)
+        self.counts = {}
+        for name, (_, labels) in SECTIONS.items():
+            codes = lookup[name][group_codes]
+            valid = codes >= 0
+            self.counts[name] = np.bincount(inverse[valid] * len(labels) + codes[valid],
+                                            minlength=n_keys * len(labels)).reshape(n_keys, len(labels))
+
+    @classmethod
+    def from_frame(cls, df, group_to_pos=GROUP_TO_POS):
+        """Parsed draws (File, Group, Club, Name). Rows without club are dropped (like groupby)."""
+        file_codes, files = pd.factorize(df['File'], sort=True)
+        club_codes, clubs = pd.factorize(df['Club'], sort=True)
+        group_codes, groups = pd.factorize(df['Group'].str.strip().str.upper())
+        rows = (file_codes >= 0) & (club_codes >= 0)
+        keys = file_codes[rows].astype(np.int64) * len(clubs) + club_codes[rows]
+        group_codes = np.where(group_codes >= 0, group_codes, len(groups))[rows]  # missing group -> no position
+        return cls(keys, group_codes, files, clubs, list(groups) + [None], group_to_pos,
+                   named=df['Name'].notna().to_numpy()[rows])
+
+    def index(self, rows=None):
+        keys = self.keys if rows is None else self.keys[rows]
+        return pd.MultiIndex.from_arrays([self.files[keys // len(self.clubs)], self.clubs[keys % len(self.clubs)]],
+                                         names=['File', 'Club'])
+
+    def conflicts(self, section, limit=None, all_in_one=True, require_assigned=False, min_players=2):
+        """Bool per (File, Club): all players in one section (all_in_one) or >= limit players in one section.
+        require_assigned: only clubs whose players all have a position."""
+        counts = self.counts[section]
+        result = self.total >= min_players
+        if require_assigned:
+            result &= counts.sum(axis=1) == self.total
+        hit = np.zeros(len(self.total), dtype=bool)
+        if all_in_one:
+            hit |= (counts > 0).sum(axis=1) == 1
+        if limit is not None:
+            hit |= counts.max(axis=1) >= limit
+        return result & hit
+
+    def near_miss_mask(self, section, limit, share=0.6):
+        """Bool per (File, Club) and section: >= share of the players in the section, but not all and below limit."""
+        counts = self.counts[section]
+        total = self.total[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (total > 1) & (counts > 0) & (counts / total >= share) & (counts < total) & (counts < limit)
+
+    def near_misses(self, section, limit, share=0.6):
+        """Near misses as table (one row per section), see near_miss_mask."""
+        counts = self.counts[section]
+        rows, col = np.nonzero(self.near_miss_mask(section, limit, share))
+        index = self.index(rows)
+        return pd.DataFrame({
+            'File': index.get_level_values('File'),
+            'Club': index.get_level_values('Club'),
+            'Type': TYPE_NAMES[section],
+            'Section': SECTIONS[section][1][col],
+            'Count': counts[rows, col],
+            'Total_players': self.total[rows],
+        })
+
+    def sections(self, section, rows):
+        """Occupied sections of the given (File, Club) rows, e.g. ['top']"""
+        labels = SECTIONS[section][1]
+        return [list(labels[self.counts[section][r] > 0]) for r in rows]
+
+    def section_counts(self, section, rows):
+        """{section: players} of the given rows, largest first"""
+        labels = SECTIONS[section][1]
+        result = []
+        for r in rows:
+            counts = self.counts[section][r]
+            order = np.argsort(-counts, kind='stable')
+            result.append({labels[i]: int(counts[i]) for i in order if counts[i] > 0})
+        return result
+
+
+def read_draws(path):
+    return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_excel(path)
@@ -0,0 +1,173 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy.stats import hypergeom, norm
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, "statistical_analysis"))
+from club_engine import ClubSections, read_draws
+from draw_model import FREE_SLOTS
+from exact_sampler import ExactSampler
+from player_metadata import build_player_index
+from batch_tests import binomial_bands
+from global_test import bh_adjust
+
+# How many club conflicts would a valid random draw produce?
+# Null draws are uniform over the valid draws (seed, group size and club rules,
+# ExactSampler, thousands of draws at once) and get the same half/quarter statistics
+# as the BTP draws (club_engine.py). Every statistic is a yes/no per draw and club.
+# p0 (share of the null draws with the event) is itself a Monte Carlo estimate, so the
+# BTP draws are compared with the null draws by Fisher's exact test (two-sided, doubled):
+# given the number of draws with the event in both, the BTP share is hypergeometric.
+# Both sides use the same club per player (most frequent club, like the sampler);
+# players without club ("UNKNOWN") are not counted as a club, and in the sampler every
+# one of them is a club of its own (they may share a group).
+
+UNKNOWN = "UNKNOWN"
+
+STATISTICS = ["half_conflict", "quarter_conflict", "half_near_miss", "quarter_near_miss",
+              "half_at_least_2", "quarter_at_least_2"]
+
+
+def event_statistics(sections):
+    """{statistic: bool per (File, Club)} with the definitions of the club distribution checks."""
+    return {
+        "half_conflict": sections.conflicts("half", limit=8, require_assigned=True),
+        "quarter_conflict": sections.conflicts("quarter", limit=4, require_assigned=True),
+        "half_near_miss": sections.near_miss_mask("half", 8).any(axis=1),
+        "quarter_near_miss": sections.near_miss_mask("quarter", 4).any(axis=1),
+        "half_at_least_2": sections.conflicts("half", limit=2, all_in_one=False),
+        "quarter_at_least_2": sections.conflicts("quarter", limit=2, all_in_one=False),
+    }
+
+
+def club_counts(sections, n_draws):
+    """(events per club and statistic (clubs x statistics), events per draw (draws x statistics))"""
+    club = sections.keys % len(sections.clubs)
+    draw = sections.keys // len(sections.clubs)
+    events = event_statistics(sections)
+    per_club = np.column_stack([np.bincount(club, weights=events[s], minlength=len(sections.clubs))
+                                for s in STATISTICS])
+    per_draw = np.column_stack([np.bincount(draw, weights=events[s], minlength=n_draws) for s in STATISTICS])
+    return per_club, per_draw
+
+
+def null_counts(sampler, player_clubs, clubs, n_null, rng, chunk=20000):
+    """Events per club and statistic over n_null null draws, sum and sum of squares of the
+    events per draw (all clubs). player_clubs: club of every sampler player."""
+    club_index = {c: i for i, c in enumerate(clubs)}
+    player_club = np.array([club_index.get(c, -1) for c in player_clubs])  # -1: no club
+    counted = player_club >= 0
+    player_club = player_club[counted]
+    per_club = np.zeros((len(clubs), len(STATISTICS)))
+    total_sum = np.zeros(len(STATISTICS))
+    total_sumsq = np.zeros(len(STATISTICS))
+    for start in range(0, n_null, chunk):
+        n = min(chunk, n_null - start)
+        assignment = sampler.sample(n, rng)[:, counted]
+        keys = np.arange(n, dtype=np.int64)[:, None] * len(clubs) + player_club[None, :]
+        sections = ClubSections(keys.ravel(), assignment.ravel().astype(np.int64), np.arange(n), clubs,
+                                sampler.groups)
+        club_part, draw_part = club_counts(sections, n)
+        per_club += club_part
+        total_sum += draw_part.sum(axis=0)
+        total_sumsq += (draw_part ** 2).sum(axis=0)
+    return per_club, total_sum, total_sumsq
+
+
+def fisher_pvalues(observed, n_draws, null, n_null):
+    """Two-sided p-values (doubled one-sided) of Fisher's exact test: observed of n_draws
+    BTP draws vs. null of n_null null draws with the event."""
+    total = observed + null
+    lower = hypergeom.cdf(observed, n_draws + n_null, n_draws, total)
+    upper = hypergeom.sf(observed - 1, n_draws + n_null, n_draws, total)
+    return np.minimum(1.0, 2 * np.minimum(lower, upper))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Club conflicts of the BTP draws compared with random valid draws.")
+    parser.add_argument("--input", default=r"D:\Maturaarbeit\all_MS_U13_parts\all_MS_U13.xlsx",
+                        help="Parsed draws of draw_parser.py (xlsx or parquet)")
+    parser.add_argument("--output", default=os.path.join(os.getcwd(), "club_null_model.xlsx"), help="Result file")
+    parser.add_argument("--n_null", type=int, default=100_000, help="Number of null draws")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    df = read_draws(args.input)
+    df["Group"] = df["Group"].str.strip().str.upper()
+    n_draws = df["File"].nunique()
+
+    # one club per player for both sides (most frequent club), without "UNKNOWN"
+    groups = list(FREE_SLOTS)
+    players = build_player_index(df.assign(Count=1), groups)
+    df["Club"] = df["Name"].map(players["Club"]).replace(UNKNOWN, np.nan)
+
+    # observed statistics
+    observed = ClubSections.from_frame(df)
+    clubs = observed.clubs
+    obs_club, obs_draw = club_counts(observed, len(observed.files))
+
+    # null model: same players, seeds and clubs, uniform over the valid draws;
+    # every player without club is a club of its own (no separation between them)
+    sampler_clubs = {name: f"{UNKNOWN} {name}" if club == UNKNOWN else club
+                     for name, club in players["Club"].items()}
+    sampler = ExactSampler(players["Seed"].to_dict(), dict(FREE_SLOTS), sampler_clubs)
+    player_clubs = list(players.loc[sampler.players, "Club"])
+    null_club, null_sum, null_sumsq = null_counts(sampler, player_clubs, list(clubs), args.n_null,
+                                                  np.random.default_rng(args.seed))
+    print(f"{args.n_null} null draws, {n_draws} BTP draws, {len(clubs)} clubs.")
+
+    # per club: observed events vs. null events (p0 is estimated, not exact)
+    p0 = null_club / args.n_null
+    lower, upper = binomial_bands(n_draws, p0)
+    p_values = fisher_pvalues(obs_club.astype(int), n_draws, null_club.astype(int), args.n_null)
+    club_players = players.groupby("Club").size().reindex(clubs, fill_value=0)
+    result = pd.DataFrame({
+        "Club": np.repeat(np.asarray(clubs), len(STATISTICS)),
+        "Players": np.repeat(club_players.values, len(STATISTICS)),
+        "Statistic": np.tile(STATISTICS, len(clubs)),
+        "Observed": obs_club.ravel().astype(int),
+        "Draws": n_draws,
+        "Null_count": null_club.ravel().astype(int),
+        "Null_probability": p0.ravel(),
+        "Null_se": np.sqrt(p0 * (1 - p0) / args.n_null).ravel(),
+        "Expected": (n_draws * p0).ravel(),
+        "Null_2.5%": lower.ravel(),
+        "Null_97.5%": upper.ravel(),
+        "p_fisher": p_values.ravel(),
+    })
+    result["q_fdr"] = bh_adjust(result["p_fisher"].values)
+
+    # all clubs: events per draw, sum over the draws is approximately normal;
+    # the null mean is estimated from n_null draws, which adds n_draws / n_null to the variance
+    mean = null_sum / args.n_null
+    var = null_sumsq / args.n_null - mean ** 2
+    sd = np.sqrt(n_draws * var * (1 + n_draws / args.n_null))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (obs_draw.sum(axis=0) - n_draws * mean) / sd
+    total = pd.DataFrame({
+        "Statistic": STATISTICS,
+        "Observed": obs_draw.sum(axis=0).astype(int),
+        "Expected": n_draws * mean,
+        "Null_sd": sd,
+        "z": z,
+        "p_normal": 2 * norm.sf(np.abs(z)),
+    })
+
+    with pd.ExcelWriter(args.output) as writer:
+        total.to_excel(writer, sheet_name="All clubs", index=False)
+        result.to_excel(writer, sheet_name="Clubs", index=False)
+
+    print(total.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+    significant = result[result["q_fdr"] < 0.05]
+    print(f"\n{len(significant)} of {len(result)} club statistics with q < 0.05")
+    if len(significant):
+        print(significant[["Club", "Statistic", "Observed", "Expected", "p_fisher", "q_fdr"]].to_string(index=False))
+    print(f"Results saved under: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
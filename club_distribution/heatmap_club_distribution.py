@@ -2,11 +2,15 @@ import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "statistics"))
+from workbook_cache import read_sheet
 
 output_folder = os.getcwd()
 
 # Load conflict summary
-conflicts = pd.read_excel(os.path.join(output_folder, "club_conflicts_summary.xlsx"))
+conflicts = read_sheet(os.path.join(output_folder, "club_conflicts_summary.xlsx"))
 
 # Clean Club names
 conflicts['Club'] = conflicts['Club'].str.strip()
@@ -34,7 +38,7 @@ plt.savefig(os.path.join(output_folder, "quarter_conflicts_per_group.png"))
 plt.show()
 
 # Load near misses
-near_misses = pd.read_excel(os.path.join(output_folder, "near_misses.xlsx"))
+near_misses = read_sheet(os.path.join(output_folder, "near_misses.xlsx"))
 near_misses['Club'] = near_misses['Club'].str.strip()
 
 # Near Misses für Half
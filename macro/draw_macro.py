@@ -3,13 +3,18 @@ import time
 import os
 from datetime import datetime
 import keyboard
-import requests
 import threading
 from dotenv import load_dotenv
 import argparse
 import os
+import sys
+
+from export_watcher import ExportWatcher
+from notifications import Notifier, PrintSink, TelegramSink
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, "parser"))
+from draw_parser import parse_file
 DEFAULT_SCREENSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "screenshots")
 DEFAULT_FOLDER_PATH = r"D:\Maturaarbeit\Draws"
 
@@ -20,6 +25,10 @@ parser.add_argument("--folder_path", type=str, default=DEFAULT_FOLDER_PATH, help
 parser.add_argument("--screenshot_dir", type=str, default=DEFAULT_SCREENSHOT_DIR, help="Folder with screenshots")
 parser.add_argument("--bot_token", type=str, default=os.getenv("BOT_TOKEN"), help="Telegram bot token")
 parser.add_argument("--chat_id", type=str, default=os.getenv("ID"), help="Telegram chat ID")
+parser.add_argument("--telegram_url", type=str, default="https://api.telegram.org",
+                    help="Base URL of the Telegram API (e.g. a local stub server for tests)")
+parser.add_argument("--export_timeout", type=float, default=20, help="Seconds until a missing or broken export is an error")
+parser.add_argument("--sheet_name", type=str, default="HE U13-Hauptfeld", help="Sheet of the export that is checked")
 
 args = parser.parse_args()
 
@@ -28,9 +37,12 @@ config = {
     "receive_message_every": args.receive_message_every,
     "folder_path": args.folder_path,
     "screenshot_dir": args.screenshot_dir,
+    "export_timeout": args.export_timeout,
+    "sheet_name": args.sheet_name,
     "telegram": {
         "bot_token": args.bot_token,
-        "chat_id": args.chat_id
+        "chat_id": args.chat_id,
+        "base_url": args.telegram_url
     }
 }
 
@@ -62,20 +74,17 @@ def safe_press(key, times=1):
         check_stop()
         pyautogui.press(key)
 
-# Telegram Bot
-def send_telegram_message(message):
-    telegram_config = config["telegram"]
-    url = f"https://api.telegram.org/bot{telegram_config['bot_token']}/sendMessage"
-    payload = {
-        "chat_id": telegram_config["chat_id"],
-        "text": message
-    }
-    try:
-        response = requests.post(url, json=payload, timeout=5)
-        if not response.ok:
-            print(f"Error sending Telegram message: Status {response.status_code}")
-    except requests.RequestException as e:
-        print(f"Error: {e}")
+# Telegram Bot (sent in the background, see notifications.py; without token the messages are printed)
+telegram_config = config["telegram"]
+bot_token = telegram_config["bot_token"] or BOT_TOKEN
+chat_id = telegram_config["chat_id"] or CHAT_ID
+if bot_token and chat_id:
+    notifier = Notifier(TelegramSink(bot_token, chat_id, base_url=telegram_config["base_url"]))
+else:
+    notifier = Notifier(PrintSink())
+
+def send_telegram_message(message, key=None):
+    notifier.notify(message, key=key)
 
 # File storage setup
 os.makedirs(config["folder_path"], exist_ok=True)
@@ -93,14 +102,18 @@ else:
 pyautogui.PAUSE = 1  # Pause zwischen Aktionen
 pyautogui.FAILSAFE = True  # Move mouse to top-left corner to abort
 
-def wait_for_file(file_path, timeout=20, interval=0.5):
-    start_time = time.monotonic()
-    while time.monotonic() - start_time < timeout:
-        if os.path.isfile(file_path):
-            return True
-        time.sleep(interval)
-    print(f"Timeout! File {file_path} could not be found.")
-    return False
+STOP_WORDS = ["WC", "St.", "Standings", "0", "Pl.", "BYE", "Freilos"]
+
+# Exports are checked in the background (export_watcher.py): as soon as BTP has
+# written a file completely, it is validated and parsed, the macro does not wait for it.
+def export_ready(file_path):
+    rows = parse_file(file_path, STOP_WORDS, config["sheet_name"])
+    if not rows:
+        raise ValueError("no players found in the export")
+    print(f"{os.path.basename(file_path)} was saved successfully ({len(rows)} players)")
+
+def export_failed(file_path, reason):
+    print(f"Error: {os.path.basename(file_path)} could NOT be saved: {reason}")
 
 # Automation functions
 def safe_click_image(image_name, fallback_coords=None, confidence=0.8):
@@ -139,12 +152,15 @@ def esc_listener():
     print("ESC detected")
     stop_event.set()
 
+watcher = ExportWatcher(config["folder_path"], export_ready, export_failed, timeout=config["export_timeout"])
+print(f"Export watcher: {watcher.backend}")
+
 # Start ESC key listener
 threading.Thread(target=esc_listener, daemon=True).start()
 time.sleep(2)  # Delay before starting automation
 
 cancelled = False
-previous_filename = None
+failed = False
 
 try:
     for i in range(config["num_draws"]):
@@ -155,33 +171,42 @@ try:
         filename = f"Draw_{current_index}_{timestamp}.xlsx"
         full_path = os.path.join(config["folder_path"], filename)
 
-        if i > 0 and previous_filename:
-            if wait_for_file(os.path.join(config["folder_path"], previous_filename)):
-                print(f"{previous_filename} was saved successfully")
-            else:
-                print(f"Error: {previous_filename} could NOT be saved")
-                send_telegram_message(f"Error in draw {current_index}: File could NOT be saved")
-                break
+        if watcher.failures:
+            failed_path, reason = watcher.failures[0]
+            send_telegram_message(f"Error in draw {current_index}: {os.path.basename(failed_path)} could NOT be saved ({reason})")
+            failed = True
+            break
 
         perform_draw()
         export_draw()
+        watcher.expect(full_path)
         save_draw(full_path)
-        time.sleep(2)
+        watcher.wait_exists(full_path, timeout=2)  # returns as soon as BTP created the file
         finalize_draw()
 
         if current_index % config["receive_message_every"] == 0:
-            send_telegram_message(f"Draw {current_index}/{start_index + config['num_draws'] - 1} completed.")
+            send_telegram_message(f"Draw {current_index}/{start_index + config['num_draws'] - 1} completed.",
+                                  key="progress")  # only the newest progress message of a batch is sent
 
         with open(index_file, "w") as f:
             f.write(str(current_index + 1))
 
-        previous_filename = filename
-
 except AutomationCancelled as e:
     cancelled = True
     print(e)
     send_telegram_message("Automation cancelled.")
 
-body = f"The script was stopped after {current_index}" if cancelled else f"All {current_index} draws were completed successfully"
+# wait for the last exports
+watcher.close(timeout=config["export_timeout"] + 1)
+if watcher.failures and not failed:
+    failed_path, reason = watcher.failures[0]
+    send_telegram_message(f"Error: {os.path.basename(failed_path)} could NOT be saved ({reason})")
+    failed = True
+
+if cancelled or failed:
+    body = f"The script was stopped after {current_index}"
+else:
+    body = f"All {current_index} draws were completed successfully"
 send_telegram_message(body)
+notifier.close()
 print("Done")
@@ -0,0 +1,258 @@
+import ctypes
+import ctypes.util
+import fnmatch
+import glob
+import os
+import select
+import struct
+import sys
+import threading
+import time
+import zipfile
+
+# Detects finished BTP exports in the background instead of polling with sleeps.
+# - Linux: inotify (via ctypes), an export counts as written when the file is closed
+#   after writing (IN_CLOSE_WRITE) or moved into the folder (IN_MOVED_TO).
+# - Other systems (Windows): polling, the file must exist, keep its size for one
+#   interval and not be locked by the writing program any more.
+# Every finished export is checked (complete xlsx zip, CRC of every part) and handed
+# to on_ready(path) in the watcher thread. Truncated or missing exports are reported
+# to on_error(path, reason) after the timeout.
+# Exports are registered with expect(path), or, with pattern (e.g. "*.xlsx"), every
+# matching file that is written after the start is handled (live pipeline).
+# With polling, the folder is only listed again when its modification time changed
+# (a file was added, removed or renamed) or after rescan_interval seconds.
+
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (name follows)
+
+
+def validate_export(path):
+    """None if path is a complete xlsx file, otherwise the reason."""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            broken = zf.testzip()
+            if broken is not None:
+                return f"corrupt part {broken}"
+            if "xl/workbook.xml" not in zf.namelist():
+                return "no workbook in file"
+    except (OSError, zipfile.BadZipFile, EOFError) as e:
+        return f"incomplete file ({e})"
+    return None
+
+
+class _Inotify:
+    """Names of files in folder that were closed after writing or moved in."""
+
+    def __init__(self, folder):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {folder}")
+        self.folder = folder
+
+    def wait(self, timeout):
+        """Finished paths of the events within timeout (any event wakes wait_exists)."""
+        finished = set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return finished
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return finished
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = EVENT.unpack_from(data, offset)
+            name = data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b"\0")
+            offset += EVENT.size + length
+            if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                finished.add(os.path.join(self.folder, os.fsdecode(name)))
+        return finished
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _Polling:
+    """Fallback: expected files whose size did not change for one interval and that are not locked."""
+
+    def __init__(self, folder, interval):
+        self.interval = interval
+        self.sizes = {}
+        self.expected = set()
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        finished = set()
+        for path in list(self.expected):
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            if self.sizes.get(path) == size and size > 0 and not _locked(path):
+                finished.add(path)
+            self.sizes[path] = size
+        return finished
+
+    def close(self):
+        pass
+
+
+def _locked(path):
+    """True while another program still has the file open for writing (Windows)."""
+    try:
+        with open(path, "ab"):
+            return False
+    except OSError:
+        return True
+
+
+class ExportWatcher:
+
+    def __init__(self, folder, on_ready, on_error=None, timeout=20, poll_interval=0.2, backend="auto",
+                 pattern=None, rescan_interval=5.0):
+        self.folder = os.path.abspath(folder)
+        self.on_ready = on_ready
+        self.on_error = on_error
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.pattern = pattern
+        self.rescan_interval = rescan_interval
+        self.failures = []  # (path, reason)
+        self.ready = []
+
+        self._backend = None
+        if backend in ("auto", "inotify") and sys.platform.startswith("linux"):
+            try:
+                self._backend = _Inotify(self.folder)
+            except (OSError, AttributeError):
+                if backend == "inotify":
+                    raise
+        if self._backend is None:
+            self._backend = _Polling(self.folder, poll_interval)
+        self.backend = "inotify" if isinstance(self._backend, _Inotify) else "polling"
+
+        self._pending = {}  # path -> (deadline, last reason)
+        self._recheck = set()  # paths to check without a new event
+        self._listed = (None, 0.0)  # (folder mtime, time) of the last listing (polling)
+        self._known = set(self._matching()) if pattern else set()  # existing files are not picked up
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _key(self, path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def _matching(self):
+        try:
+            mtime = os.stat(self.folder).st_mtime_ns
+        except OSError:
+            mtime = None
+        self._listed = (mtime, time.monotonic())
+        return [self._key(p) for p in glob.glob(os.path.join(self.folder, self.pattern))]
+
+    def _folder_changed(self):
+        """True if the folder has to be listed again (polling): mtime changed or rescan_interval passed."""
+        mtime, listed_at = self._listed
+        if time.monotonic() - listed_at >= self.rescan_interval:
+            return True
+        try:
+            return os.stat(self.folder).st_mtime_ns != mtime
+        except OSError:
+            return False
+
+    def expect(self, path):
+        """Registers an export that is about to be written, returns immediately."""
+        key = self._key(path)
+        with self._cond:
+            self._known.add(key)
+            self._pending[key] = (time.monotonic() + self.timeout, "file not found")
+            self._recheck.add(key)  # may already be written completely
+            if isinstance(self._backend, _Polling):
+                self._backend.expected.add(key)
+
+    def wait_exists(self, path, timeout):
+        """Waits until the file exists (e.g. before confirming the save dialog), at most timeout seconds."""
+        with self._cond:
+            return self._cond.wait_for(lambda: os.path.isfile(path), timeout)
+
+    @property
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _finish(self, key, reason=None):
+        with self._cond:
+            self._pending.pop(key, None)
+            if isinstance(self._backend, _Polling):
+                self._backend.expected.discard(key)
+                self._backend.sizes.pop(key, None)
+            if reason is None:
+                self.ready.append(key)
+            else:
+                self.failures.append((key, reason))
+            self._cond.notify_all()
+        try:
+            if reason is None:
+                self.on_ready(key)
+            elif self.on_error is not None:
+                self.on_error(key, reason)
+        except Exception as e:  # a failing handler must not stop the watcher
+            with self._cond:
+                self.failures.append((key, f"handler failed: {e}"))
+            if reason is None and self.on_error is not None:
+                try:
+                    self.on_error(key, f"handler failed: {e}")
+                except Exception as e2:
+                    with self._cond:
+                        self.failures.append((key, f"error handler failed: {e2}"))
+
+    def _run(self):
+        while not self._stop.is_set():
+            finished = {self._key(p) for p in self._backend.wait(self.poll_interval)}
+            if self.pattern:
+                # new files: inotify reports them when written, polling lists the folder if it changed
+                if isinstance(self._backend, _Polling):
+                    new = self._matching() if self._folder_changed() else []
+                else:
+                    new = [k for k in finished if fnmatch.fnmatch(os.path.basename(k), os.path.normcase(self.pattern))]
+                for key in new:
+                    if key not in self._known:
+                        self.expect(key)
+            with self._cond:
+                candidates = finished | self._recheck
+                self._recheck = set()
+                candidates &= set(self._pending)
+                self._cond.notify_all()  # wake wait_exists
+
+            for key in candidates:
+                if not os.path.isfile(key):
+                    continue
+                reason = validate_export(key)
+                if reason is None:
+                    self._finish(key)
+                else:
+                    with self._cond:
+                        if key in self._pending:  # maybe still written, wait for the next close
+                            self._pending[key] = (self._pending[key][0], reason)
+
+            now = time.monotonic()
+            with self._cond:
+                expired = [(k, r) for k, (deadline, r) in self._pending.items() if deadline < now]
+            for key, reason in expired:
+                self._finish(key, reason)
+
+    def close(self, timeout=None):
+        """Waits until all expected exports are handled (at most timeout s), stops the thread."""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._pending, timeout)
+        self._stop.set()
+        self._thread.join()
+        self._backend.close()
@@ -0,0 +1,160 @@
+import argparse
+import glob
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from scipy.stats import chi2_contingency
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, "statistical_analysis"))
+sys.path.insert(0, os.path.join(BASE_DIR, "parser"))
+from draw_model import FREE_SLOTS, parser_seed
+from global_test import bh_adjust
+from mrv_sampler import MRVSampler
+from player_metadata import build_player_index
+from draw_parser import parse_file
+
+# Headless stand-in for draw_macro.py: draws are generated in Python with the
+# same rules as BTP (seed groups, group sizes, no two players of one club in a group,
+# see draw_model.py / mrv_sampler.py) and written as xlsx exports in the layout of
+# BTP, so draw_parser.py reads them like real exports.
+# --validate compares the generated draws with the collected BTP draws
+# (Chi² homogeneity test per player, player x group counts).
+
+SHEET_NAME = "HE U13-Hauptfeld"
+GROUP_HEADER = "HE U13 - Group"
+STOP_WORDS = ["WC", "St.", "Standings", "0", "Pl.", "BYE", "Freilos"]
+FILE_RE = re.compile(r"Ausl_(\d+)\.xlsx$")
+
+
+def load_players(path):
+    """(players frame with Seed and Club, parsed draws or None).
+    path: parsed draws of draw_parser.py or a player list (Name, Seed, Club)."""
+    df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_excel(path)
+    if "Group" in df.columns:
+        return build_player_index(df.assign(Count=1), list(FREE_SLOTS)), df
+    players = df.set_index("Name")[["Seed", "Club"]].copy()
+    players["Seed"] = pd.Series([parser_seed(s) for s in players["Seed"]], index=players.index, dtype=object)
+    players["Club"] = players["Club"].fillna("UNKNOWN")
+    return players, None
+
+
+def display_name(name, seed):
+    return f"{name} [{seed}]" if seed is not None else name
+
+
+def write_export(path, groups, members, clubs, names):
+    """One draw as xlsx in the layout of the BTP export (only the main draw sheet).
+    members: {group: [player index]}, seeded players first."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(SHEET_NAME)
+    ws.append(["Standings"])
+    for g in groups:
+        ws.append([f"{GROUP_HEADER} {g}"])
+        for pos, p in enumerate(members[g], start=1):
+            ws.append([pos, None, clubs[p], names[p]])
+    wb.save(path)
+
+
+def next_index(folder):
+    numbers = [int(m.group(1)) for f in glob.glob(os.path.join(folder, "Ausl_*.xlsx"))
+               if (m := FILE_RE.search(os.path.basename(f)))]
+    return max(numbers, default=0) + 1
+
+
+def generate(players, n_draws, folder, rng, start_index=None):
+    """Writes n_draws exports Ausl_<n>.xlsx, returns their paths."""
+    seed_map = players["Seed"].to_dict()
+    sampler = MRVSampler(seed_map, dict(FREE_SLOTS), players["Club"].to_dict())
+    assignment = sampler.sample(n_draws, rng)
+
+    names = [display_name(p, seed_map[p]) for p in sampler.players]
+    clubs = list(players.loc[sampler.players, "Club"])
+    seeded = sampler.seeded
+    start = next_index(folder) if start_index is None else start_index
+
+    paths = []
+    for i, draw in enumerate(assignment):
+        # order inside a group: seed first, the rest at random (like BTP)
+        order = rng.permutation(len(draw))
+        order = order[np.argsort(~seeded[order], kind="stable")]
+        members = {g: [p for p in order if draw[p] == gi] for gi, g in enumerate(sampler.groups)}
+        path = os.path.join(folder, f"Ausl_{start + i}.xlsx")
+        write_export(path, sampler.groups, members, clubs, names)
+        paths.append(path)
+    return paths
+
+
+def count_table(df, players, groups):
+    counts = df.groupby(["Name", "Group"]).size().unstack(fill_value=0)
+    return counts.reindex(index=players, columns=groups, fill_value=0)
+
+
+def club_conflicts(df):
+    """Share of draws with two players of the same club in one group."""
+    per_group = df.groupby(["File", "Group", "Club"]).size()
+    conflicts = per_group[(per_group > 1) & (per_group.index.get_level_values("Club") != "UNKNOWN")]
+    return conflicts.index.get_level_values("File").nunique() / df["File"].nunique()
+
+
+def validate(observed, generated, groups):
+    """Chi² homogeneity test per player: BTP draws vs. headless draws."""
+    players = sorted(set(observed["Name"]) | set(generated["Name"]))
+    obs = count_table(observed, players, groups)
+    gen = count_table(generated, players, groups)
+    rows = []
+    for p in players:
+        table = np.array([obs.loc[p].values, gen.loc[p].values])
+        table = table[:, table.sum(axis=0) > 0]
+        if table.shape[1] < 2 or (table.sum(axis=1) == 0).any():
+            chi2, p_value, dof = 0.0, 1.0, 0  # fixed group (seed 1/2) or missing
+        else:
+            chi2, p_value, dof, _ = chi2_contingency(table)
+        rows.append({"Player": p, "Draws_BTP": int(obs.loc[p].sum()), "Draws_headless": int(gen.loc[p].sum()),
+                     "Chi2": chi2, "df": dof, "p_value": p_value})
+    result = pd.DataFrame(rows)
+    result["q_fdr"] = bh_adjust(result["p_value"].values)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate BTP draw exports without the GUI.")
+    parser.add_argument("--players", default=r"D:\Maturaarbeit\all_MS_U13_parts_real_names\all_MS_U13.parquet",
+                        help="Parsed BTP draws (draw_parser.py) or player list with Name, Seed, Club")
+    parser.add_argument("--num_draws", type=int, default=1000, help="Number of draws")
+    parser.add_argument("--output_folder", default=r"D:\Maturaarbeit\Draws\headless", help="Folder for the exports")
+    parser.add_argument("--start_index", type=int, default=None, help="First file number (default: continue)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument("--validate", action="store_true",
+                        help="Compare with the BTP draws in --players (needs parsed draws)")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_folder, exist_ok=True)
+    rng = np.random.default_rng(args.seed)
+    players, observed = load_players(args.players)
+    print(f"{len(players)} players, {int(players['Seed'].notna().sum())} seeded.")
+
+    paths = generate(players, args.num_draws, args.output_folder, rng, args.start_index)
+    print(f"{len(paths)} exports written to {args.output_folder}")
+
+    if args.validate:
+        if observed is None:
+            print("Validation needs parsed BTP draws (--players).")
+            return
+        # read the exports back with the parser, this also checks the layout
+        generated = pd.DataFrame([row for path in paths for row in parse_file(path, STOP_WORDS, SHEET_NAME)])
+        result = validate(observed, generated, list(FREE_SLOTS))
+        print(result.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+        print(f"Club conflicts per draw: BTP {club_conflicts(observed):.4f}, headless {club_conflicts(generated):.4f}")
+        print(f"Players with q < 0.05: {(result['q_fdr'] < 0.05).sum()} of {len(result)}")
+        out_path = os.path.join(args.output_folder, "validation_headless_vs_btp.xlsx")
+        result.to_excel(out_path, index=False)
+        print(f"Validation saved under: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import queue
+import threading
+import time
+
+import requests
+
+# Notifications without blocking the draw loop.
+# notify() only puts the message into a queue. A background thread collects the
+# messages for batch_interval seconds and sends them as one message:
+# - messages with the same key (e.g. "progress") are coalesced, only the newest is sent
+# - failed sends are retried with exponential backoff (Telegram "retry_after" is respected)
+# The sink is pluggable: TelegramSink (base_url can point to a local stub server), PrintSink.
+
+MAX_MESSAGE_LENGTH = 4096  # Telegram limit
+
+
+class SendError(Exception):
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TelegramSink:
+
+    def __init__(self, bot_token, chat_id, base_url="https://api.telegram.org", timeout=5):
+        self.url = f"{base_url.rstrip('/')}/bot{bot_token}/sendMessage"
+        self.chat_id = chat_id
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def send(self, text):
+        try:
+            response = self.session.post(self.url, json={"chat_id": self.chat_id, "text": text}, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise SendError(str(e))
+        if not response.ok:
+            retry_after = None
+            if response.status_code == 429:
+                try:
+                    retry_after = response.json().get("parameters", {}).get("retry_after")
+                except ValueError:
+                    pass
+            raise SendError(f"Status {response.status_code}", retry_after)
+
+
+class PrintSink:
+
+    def send(self, text):
+        print(f"[notification] {text}")
+
+
+class Notifier:
+
+    def __init__(self, sink, batch_interval=2.0, max_retries=5, backoff=1.0, max_backoff=60.0):
+        self.sink = sink
+        self.batch_interval = batch_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sent = 0
+        self.dropped = 0
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def notify(self, text, key=None):
+        """Queues a message, never blocks. Messages with the same key replace each other."""
+        self._queue.put((key, text))
+
+    def _collect(self):
+        """Messages of one batch (in order, coalesced by key), None after close()."""
+        item = self._queue.get()
+        if item is None:
+            return None
+        batch = {}
+        number = 0
+        deadline = time.monotonic() + self.batch_interval
+        stop = False
+        while True:
+            key, text = item
+            number += 1
+            slot = ("key", key) if key is not None else ("msg", number)
+            batch.pop(slot, None)  # newest message of a key moves to the end
+            batch[slot] = text
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+        return list(batch.values()), stop
+
+    def _send(self, text):
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.sink.send(text)
+                self.sent += 1
+                return
+            except SendError as e:
+                if attempt == self.max_retries:
+                    print(f"Error sending notification (given up): {e}")
+                    self.dropped += 1
+                    return
+                wait = e.retry_after if e.retry_after is not None else delay
+                time.sleep(min(wait, self.max_backoff))
+                delay = min(delay * 2, self.max_backoff)
+
+    def _run(self):
+        while True:
+            collected = self._collect()
+            if collected is None:
+                return
+            messages, stop = collected
+            text = ""
+            try:
+                for message in messages:
+                    if text and len(text) + 1 + len(message) > MAX_MESSAGE_LENGTH:
+                        self._send(text)
+                        text = ""
+                    text = f"{text}\n{message}" if text else message[:MAX_MESSAGE_LENGTH]
+                self._send(text)
+            except Exception as e:  # any other error of the sink must not stop the thread
+                print(f"Error sending notification: {e}")
+                self.dropped += 1
+            if stop:
+                return
+
+    def close(self, timeout=None):
+        """Sends the remaining messages and stops the thread.
+        timeout=None waits until every message is sent or given up (the retries are bounded),
+        so the last messages are not lost at exit."""
+        self._queue.put(None)
+        self._thread.join(timeout)
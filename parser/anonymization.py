@@ -1,37 +1,114 @@
 import pandas as pd
-import glob, os
-
-# folder paths
-input_folder = r"D:\Maturaarbeit\all_MS_U13_parts_real_names"
-output_folder = r"D:\Maturaarbeit\all_MS_U13_parts"
-os.makedirs(output_folder, exist_ok=True)
-
-# mapping dicts
-club_map = {}
-player_map = {}
-club_counter = 1
-player_counter = 1
-
-# main loop
-for file in glob.glob(os.path.join(input_folder, "*.xlsx")):
-    df = pd.read_excel(file)
-
-    # Clubs anonymisieren
-    for club in df['Club'].unique():
-        if club not in club_map:
-            club_map[club] = f"Club{club_counter}"
-            club_counter += 1
-    df['Club'] = df['Club'].map(club_map)
-
-    # Spielernamen anonymisieren
-    for player in df['Name'].unique():
-        if player not in player_map:
-            player_map[player] = f"Player{player_counter}"
-            player_counter += 1
-    df['Name'] = df['Name'].map(player_map)
-
-    # save
-    filename = os.path.basename(file)
-    df.to_excel(os.path.join(output_folder, filename), index=False)
-
-print("Finished.")
+import numpy as np
+import argparse
+import glob
+import os
+
+# Anonymisation of the parsed draws (clubs -> "Club<n>", players -> "Player<n>").
+# The mapping is stored as CSV (column, original, anonymised) with the real-name files
+# (it reverses the anonymisation, so never next to the anonymised output),
+# so a rerun on new files keeps the IDs of known names and only numbers new names.
+# Can run on its own (parts of draw_parser.py -> anonymised copies) or as a stage of
+# draw_parser.py (--anonymize_folder), then no second read/write of the files is needed.
+
+MAPPING_NAME = "anonymization_map.csv"
+PREFIXES = {"Club": "Club", "Name": "Player"}
+MISSING = ""  # missing values (e.g. no club) get an ID too, stored with an empty original
+
+
+def load_mapping(path):
+    """{column: {original: anonymised}}, empty if the file does not exist."""
+    mapping = {col: {} for col in PREFIXES}
+    if os.path.isfile(path):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        for col, group in df.groupby("Column", sort=False):
+            mapping[col] = dict(zip(group["Original"], group["Anonymized"]))
+    return mapping
+
+
+def save_mapping(path, mapping):
+    df = pd.DataFrame(
+        [(col, original, anon) for col, values in mapping.items() for original, anon in values.items()],
+        columns=["Column", "Original", "Anonymized"],
+    )
+    tmp = path + ".tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)  # never leaves a half-written mapping
+
+
+def check_mapping_path(mapping_path, anonymised_folder):
+    """The mapping must not be stored with the anonymised files."""
+    folder = os.path.normcase(os.path.abspath(anonymised_folder))
+    if os.path.normcase(os.path.dirname(os.path.abspath(mapping_path))) == folder:
+        raise ValueError(f"The mapping {mapping_path} would undo the anonymisation, "
+                         f"store it outside of {anonymised_folder}")
+    old = os.path.join(anonymised_folder, MAPPING_NAME)
+    if os.path.isfile(old):
+        print(f"Warning: {old} contains the real names, move it to {mapping_path}")
+
+
+def next_number(values, prefix):
+    numbers = [int(v[len(prefix):]) for v in values if v[len(prefix):].isdigit()]
+    return max(numbers, default=0) + 1
+
+
+def anonymize_column(series, values, prefix):
+    """Maps one column with the categorical codes, new names get the next numbers
+    (in order of appearance)."""
+    codes, uniques = pd.factorize(series.astype("string").fillna(MISSING))
+    new = [u for u in uniques if u not in values]
+    start = next_number(values.values(), prefix)
+    values.update({u: f"{prefix}{start + i}" for i, u in enumerate(new)})
+    anonymised = np.array([values[u] for u in uniques], dtype=object)
+    return pd.Series(anonymised[codes], index=series.index, name=series.name)
+
+
+def anonymize(df, mapping):
+    """Anonymised copy of df, mapping is extended in place."""
+    df = df.copy()
+    for col, prefix in PREFIXES.items():
+        if col in df.columns:
+            df[col] = anonymize_column(df[col], mapping[col], prefix)
+    return df
+
+
+def main():
+    from draw_parser import natkey, read_chunk, write_table
+
+    parser = argparse.ArgumentParser(description="Anonymise the parsed draw files.")
+    parser.add_argument("--input_folder", default=r"D:\Maturaarbeit\all_MS_U13_parts_real_names")
+    parser.add_argument("--output_folder", default=r"D:\Maturaarbeit\all_MS_U13_parts")
+    parser.add_argument("--mapping", default=None,
+                        help=f"Mapping file (default: {MAPPING_NAME} in the input folder, never in the output folder)")
+    parser.add_argument("--full", action="store_true", help="Write all files again, also if up to date")
+    args = parser.parse_args()
+    os.makedirs(args.output_folder, exist_ok=True)
+
+    mapping_path = args.mapping or os.path.join(args.input_folder, MAPPING_NAME)
+    check_mapping_path(mapping_path, args.output_folder)
+    known_mapping = os.path.isfile(mapping_path)
+    mapping = load_mapping(mapping_path)
+
+    # Parquet or Excel files of draw_parser.py, the same format is written
+    # (an Excel export next to a Parquet file of the same name holds the same draws)
+    parquet_files = glob.glob(os.path.join(args.input_folder, "*.parquet"))
+    parquet_names = {os.path.splitext(os.path.basename(p))[0] for p in parquet_files}
+    files = sorted(parquet_files + [p for p in glob.glob(os.path.join(args.input_folder, "*.xlsx"))
+                                    if os.path.splitext(os.path.basename(p))[0] not in parquet_names], key=natkey)
+    written = 0
+    for file in files:
+        out_path = os.path.join(args.output_folder, os.path.basename(file))
+        # without the old mapping, existing outputs do not match the new IDs
+        if (not args.full and known_mapping and os.path.isfile(out_path)
+                and os.path.getmtime(out_path) >= os.path.getmtime(file)):
+            continue
+        write_table(anonymize(read_chunk(args.input_folder, os.path.basename(file)), mapping), out_path)
+        written += 1
+
+    save_mapping(mapping_path, mapping)
+    print(f"Finished. {written} of {len(files)} files written, "
+          f"{len(mapping['Club'])} clubs and {len(mapping['Name'])} players in {mapping_path}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import argparse
+import glob
+import os
+import time
+
+from draw_parser import natkey, parse_file, parse_file_pandas
+
+# Compares the streaming xlsx reader with the old pandas reader on sample exports:
+# both must give the same rows, prints the time per file.
+
+STOP_WORDS = ["WC", "St.", "Standings", "0", "Pl.", "BYE", "Freilos"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the BTP export readers.")
+    parser.add_argument("--input_folder", default=r"D:\Maturaarbeit\Draws\docs", help="Folder with Excel files")
+    parser.add_argument("--sheet_name", default="HE U13-Hauptfeld", help="Excel sheet name to parse")
+    parser.add_argument("--limit", type=int, default=200, help="Number of files")
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.input_folder, "*.xlsx")), key=natkey)[:args.limit]
+    if not files:
+        print("No files found.")
+        return
+
+    results, times = {}, {}
+    for name, func in [("pandas", parse_file_pandas), ("xlsx", parse_file)]:
+        start = time.perf_counter()
+        results[name] = [func(f, STOP_WORDS, args.sheet_name) for f in files]
+        times[name] = time.perf_counter() - start
+        print(f"{name:>6}: {times[name]:.2f} s, {1000 * times[name] / len(files):.1f} ms per file")
+
+    same = results["pandas"] == results["xlsx"]
+    print(f"{len(files)} files, same rows: {same}, speed-up: {times['pandas'] / times['xlsx']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
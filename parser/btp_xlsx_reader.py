@@ -0,0 +1,104 @@
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+# Minimal streaming reader for the xlsx exports of BTP.
+# Reads only one sheet and only the requested columns directly from the xlsx zip
+# (iterparse, row by row) instead of loading the whole sheet into a DataFrame.
+# Values are returned like openpyxl/pandas: str, int (whole numbers), float, bool or None.
+
+NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+CELL_REF_RE = re.compile(r"([A-Z]+)(\d+)")
+
+
+def column_index(letters):
+    """'A' -> 0, 'C' -> 2, 'AA' -> 26"""
+    idx = 0
+    for ch in letters:
+        idx = idx * 26 + ord(ch) - 64
+    return idx - 1
+
+
+def _sheet_path(zf, sheet_name):
+    workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+    rel_id = None
+    for sheet in workbook.iter(f"{NS}sheet"):
+        if sheet.get("name") == sheet_name:
+            rel_id = sheet.get(f"{REL_NS}id")
+            break
+    if rel_id is None:
+        raise KeyError(f"Worksheet named '{sheet_name}' not found")
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.iter(f"{PKG_REL_NS}Relationship"):
+        if rel.get("Id") == rel_id:
+            target = rel.get("Target")
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return posixpath.normpath(posixpath.join("xl", target))
+    raise KeyError(f"Worksheet '{sheet_name}' has no target")
+
+
+def _shared_strings(zf):
+    try:
+        data = zf.open("xl/sharedStrings.xml")
+    except KeyError:
+        return []
+    strings = []
+    with data:
+        for _, elem in ET.iterparse(data):
+            if elem.tag == f"{NS}si":
+                strings.append("".join(t.text or "" for t in elem.iter(f"{NS}t")))
+                elem.clear()
+    return strings
+
+
+def _number(text):
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def _cell_value(cell, shared):
+    kind = cell.get("t")
+    if kind == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter(f"{NS}t"))
+    v = cell.find(f"{NS}v")
+    if v is None or v.text is None:
+        return None
+    if kind == "s":
+        return shared[int(v.text)]
+    if kind in ("str", "e"):
+        return v.text
+    if kind == "b":
+        return v.text == "1"
+    if kind in (None, "n"):
+        return _number(v.text)
+    return v.text  # unknown cell type (e.g. "d" dates), kept as text
+
+
+def iter_rows(path, sheet_name, columns=("A", "C", "D")):
+    """Yields one tuple per row with the values of the requested columns (None = empty).
+    Completely empty rows are skipped."""
+    wanted = {column_index(c): i for i, c in enumerate(columns)}
+    with zipfile.ZipFile(path) as zf:
+        shared = _shared_strings(zf)
+        with zf.open(_sheet_path(zf, sheet_name)) as data:
+            for _, elem in ET.iterparse(data):
+                if elem.tag != f"{NS}row":
+                    continue
+                values = [None] * len(columns)
+                found = False
+                for position, cell in enumerate(elem.iter(f"{NS}c")):
+                    ref = cell.get("r")
+                    col = column_index(CELL_REF_RE.match(ref).group(1)) if ref else position
+                    if col in wanted:
+                        value = _cell_value(cell, shared)
+                        if value is not None and value != "":  # empty strings are empty cells, like pandas
+                            values[wanted[col]] = value
+                            found = True
+                elem.clear()
+                if found:
+                    yield tuple(values)
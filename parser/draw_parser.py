@@ -5,13 +5,30 @@ import re
 import pathlib
 from tqdm import tqdm
 import argparse
+import sys
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from zipfile import BadZipFile
+
+from anonymization import MAPPING_NAME, anonymize, check_mapping_path, load_mapping, save_mapping
+from btp_xlsx_reader import iter_rows
+from parse_manifest import classify, empty_manifest, file_entry, load_manifest, save_manifest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "statistics"))
+from evaluation_store import write_excel
 
 # Utility functions
 
+SEED_RE = re.compile(r"\[(\d+(?:/\d+)?)\]")
+SEED_SUFFIX_RE = re.compile(r"\s*\[(\d+(?:/\d+)?)\]\s*$")
+FILE_ID_RE = re.compile(r"Ausl_(\d+)")
+GROUP_HEADER = "HE U13 - Group"
+
 # extract seed from player names
 def extract_seed(cell_value):
     if isinstance(cell_value, str):
-        match = re.search(r"\[(\d+(?:/\d+)?)\]", cell_value)
+        match = SEED_RE.search(cell_value)
         if match:
             return match.group(1)
     return None
@@ -19,10 +36,17 @@ def extract_seed(cell_value):
 
 def clean_name(cell_value):
     if isinstance(cell_value, str):
-        return re.sub(r"\s*\[(\d+(?:/\d+)?)\]\s*$", "", cell_value).strip()
+        return SEED_SUFFIX_RE.sub("", cell_value).strip()
     return cell_value
 
 
+def file_id(file_path):
+    """Draw number from "Ausl_<n>.xlsx", otherwise the file name."""
+    name = os.path.basename(file_path)
+    match = FILE_ID_RE.search(name)
+    return match.group(1) if match else name
+
+
 def natkey(path):
     s = pathlib.Path(path).stem
     parts = re.split(r"(\d+)", s)
@@ -30,7 +54,40 @@ def natkey(path):
 
 
 def parse_file(file_path, stop_words, sheet_name):
-    
+    """Streams columns A (group headers), C (club) and D (name) of the sheet, one pass."""
+    try:
+        rows = list(iter_rows(file_path, sheet_name, columns=("A", "C", "D")))
+    except (OSError, KeyError, ValueError, BadZipFile, ET.ParseError) as e:
+        tqdm.write(f"Error reading {file_path}: {e}")
+        return []
+
+    draw = file_id(file_path)
+    results = []
+    group = None
+    for header, club, raw in rows:
+        if isinstance(header, str) and header.startswith(GROUP_HEADER):
+            group = header.split()[-1]
+        if group is None or raw is None:
+            continue
+
+        raw_name = str(raw).strip()
+        name = clean_name(raw_name)
+        if name in stop_words:
+            continue
+
+        results.append({
+            "File": draw,
+            "Group": group,
+            "Club": str(club).strip() if club is not None else "UNKNOWN",
+            "Name": name,
+            "Seed": extract_seed(raw_name),
+        })
+
+    return results
+
+
+def parse_file_pandas(file_path, stop_words, sheet_name):
+    """Old reader (whole sheet via pandas/openpyxl), kept as fallback and benchmark reference."""
     try:
         df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
     except Exception as e:
@@ -67,6 +124,71 @@ def parse_file(file_path, stop_words, sheet_name):
     return results
 
 
+def parse_files(files, stop_words, sheet_name, workers=1, reader="xlsx"):
+    """Yields the parsed rows of every file, in the order of files.
+    workers > 1 (0 = all cores) parses on a process pool."""
+    parse_func = parse_file if reader == "xlsx" else parse_file_pandas
+    parse = partial(parse_func, stop_words=stop_words, sheet_name=sheet_name)
+    if workers == 1:
+        yield from map(parse, files)
+        return
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, min(64, len(files) // (workers * 8)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(parse, files, chunksize=chunksize)
+
+
+CHUNK_PREFIX = "all_MS_U13_part"
+MASTER_BASE = "all_MS_U13"
+COLUMNS = ["File", "Group", "Club", "Name", "Seed"]
+
+
+def chunk_number(chunk_name):
+    return int(re.search(r"(\d+)\.\w+$", chunk_name).group(1))
+
+
+def read_chunk(folder, chunk_name):
+    path = os.path.join(folder, chunk_name)
+    if not os.path.isfile(path):
+        return pd.DataFrame(columns=COLUMNS)
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    df = pd.read_excel(path)
+    df["File"] = df["File"].astype(str)  # draw numbers come back as numbers from Excel
+    return df
+
+
+def write_table(df, path):
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        write_excel([("Sheet1", df, False)], path)  # split above the Excel row limit
+
+
+def write_chunk(folder, chunk_name, df, anon=None):
+    """anon = (folder, mapping, mapping path): also writes the anonymised chunk (anonymization.py)."""
+    out_path = os.path.join(folder, chunk_name)
+    write_table(df, out_path)
+    tqdm.write(f"Saved chunk: {out_path}")
+    if anon is not None:
+        write_table(anonymize(df, anon[1]), os.path.join(anon[0], chunk_name))
+        save_mapping(anon[2], anon[1])
+
+
+def rows_frame(rows):
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def remove_stale_chunks(folder, chunks):
+    """Deletes chunk files that are not in the manifest (left over from a run before --full
+    or in another format), so that they are not read as draws by the next steps."""
+    for path in glob.glob(os.path.join(folder, f"{CHUNK_PREFIX}*")):
+        name = os.path.basename(path)
+        if name not in chunks and re.fullmatch(rf"{CHUNK_PREFIX}\d+\.(parquet|xlsx)", name):
+            os.remove(path)
+            tqdm.write(f"Removed stale chunk: {path}")
+
+
 def main():
     # Argument parser
     parser = argparse.ArgumentParser(description="Parse U13 draw Excel files.") 
@@ -74,43 +196,145 @@ def main():
     parser.add_argument("--output_folder", default=r"D:\Maturaarbeit\all_MS_U13_parts_real_names", help="Folder to save output")
     parser.add_argument("--sheet_name", default="HE U13-Hauptfeld", help="Excel sheet name to parse")
     parser.add_argument("--chunk_size", type=int, default=200, help="Number of files per chunk")
+    parser.add_argument("--workers", type=int, default=1, help="Parallel processes (1 = sequential, 0 = all cores)")
+    parser.add_argument("--reader", choices=["xlsx", "pandas"], default="xlsx",
+                        help="xlsx: streaming reader (fast), pandas: read the whole sheet (old)")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and parse all files again")
+    parser.add_argument("--format", choices=["parquet", "xlsx"], default="parquet",
+                        help="File format of the chunks and the master file")
+    parser.add_argument("--excel_master", action="store_true",
+                        help="Additionally write the master file as Excel (slow for big runs)")
+    parser.add_argument("--anonymize_folder", default=None,
+                        help="Also write anonymised chunks and master file to this folder (same pass)")
+    parser.add_argument("--mapping", default=None,
+                        help=f"Anonymisation mapping (default: {MAPPING_NAME} in the output folder)")
     args = parser.parse_args()
 
     os.makedirs(args.output_folder, exist_ok=True)
+    out = args.output_folder
 
     stop_words = ["WC", "St.", "Standings", "0", "Pl.", "BYE", "Freilos"]
 
     excel_files = sorted(glob.glob(os.path.join(args.input_folder, "*.xlsx")), key=natkey)
 
+    # Only new or changed exports are parsed (see parse_manifest.py)
+    fmt = args.format
+    anon = None
+    if args.anonymize_folder:
+        os.makedirs(args.anonymize_folder, exist_ok=True)
+        mapping_path = args.mapping or os.path.join(out, MAPPING_NAME)  # with the real names, not the anonymised files
+        check_mapping_path(mapping_path, args.anonymize_folder)
+        anon = (args.anonymize_folder, load_mapping(mapping_path), mapping_path)
+    manifest = empty_manifest(args.sheet_name, fmt) if args.full else load_manifest(out, args.sheet_name, fmt)
+    new_files, changed_files, removed = classify(manifest, excel_files)
+    master_out = os.path.join(out, f"{MASTER_BASE}.{fmt}")
+    excel_out = os.path.join(out, f"{MASTER_BASE}.xlsx")
+    tqdm.write(f"{len(new_files)} new, {len(changed_files)} changed, {len(removed)} removed files.")
+    if (not (new_files or changed_files or removed) and os.path.isfile(master_out)
+            and (not args.excel_master or os.path.isfile(excel_out))
+            and (anon is None or os.path.isfile(os.path.join(anon[0], os.path.basename(master_out))))):
+        save_manifest(out, manifest)
+        tqdm.write("Nothing to do, all chunks and master file are up to date.")
+        return
+
+    frames = {}  # chunk name -> rows written in this run
+
+    # Changed and removed exports: rebuild only the chunks that contain them
+    reparsed = dict(zip(
+        (os.path.basename(p) for p in changed_files),
+        parse_files(changed_files, stop_words, args.sheet_name, workers=args.workers, reader=args.reader),
+    ))
+    affected = {manifest["files"][name]["chunk"] for name in list(reparsed) + removed}
+    for chunk in sorted(affected, key=chunk_number):
+        # the old rows are only needed for exports that stay unchanged
+        if any(n not in removed and n not in reparsed for n in manifest["chunks"][chunk]):
+            old = read_chunk(out, chunk)
+            old_file = old["File"].astype(str)
+        names, parts = [], []
+        for name in manifest["chunks"][chunk]:
+            if name in removed:
+                continue
+            names.append(name)
+            if name in reparsed:
+                parts.append(rows_frame(reparsed[name]))
+            else:
+                parts.append(old[old_file == file_id(name)])
+        for name in manifest["chunks"][chunk]:
+            if name in removed:
+                del manifest["files"][name]
+            elif name in reparsed:
+                manifest["files"][name] = file_entry(os.path.join(args.input_folder, name), chunk)
+        if names:
+            frames[chunk] = pd.concat(parts, ignore_index=True)
+            write_chunk(out, chunk, frames[chunk], anon)
+            manifest["chunks"][chunk] = names
+        else:
+            del manifest["chunks"][chunk]
+            if os.path.isfile(os.path.join(out, chunk)):
+                os.remove(os.path.join(out, chunk))
+            if anon is not None and os.path.isfile(os.path.join(anon[0], chunk)):
+                os.remove(os.path.join(anon[0], chunk))
+        save_manifest(out, manifest)
+
+    # New exports: fill up the last chunk, then continue with new chunks
+    chunks = list(manifest["chunks"])
+    if chunks and len(manifest["chunks"][chunks[-1]]) < args.chunk_size:
+        chunk = chunks[-1]
+        names = list(manifest["chunks"][chunk])
+        parts = [frames[chunk] if chunk in frames else read_chunk(out, chunk)]
+    else:
+        chunk = f"{CHUNK_PREFIX}{max(map(chunk_number, chunks), default=0) + 1}.{fmt}"
+        names, parts = [], []
     all_results = []
-    chunk_counter = 1
     file_counter = 0
 
-    # Process files with tqdm progress bar
-    for file_path in tqdm(excel_files, desc="Processing files", ncols=100):
+    # Process files with tqdm progress bar (results arrive in file order, also in parallel mode)
+    parsed = parse_files(new_files, stop_words, args.sheet_name, workers=args.workers, reader=args.reader)
+    for file_path, file_results in tqdm(zip(new_files, parsed), total=len(new_files),
+                                        desc="Processing files", ncols=100):
         file_counter += 1
-        if file_counter % 50 == 0 or file_counter == len(excel_files):
+        if file_counter % 50 == 0 or file_counter == len(new_files):
             tqdm.write(f"Processing file: {os.path.basename(file_path)}")  # print every 50 files
 
-        file_results = parse_file(file_path, stop_words, args.sheet_name)
         all_results.extend(file_results)
+        names.append(os.path.basename(file_path))
+        manifest["files"][names[-1]] = file_entry(file_path, chunk)
 
         # Save chunk
-        if file_counter % args.chunk_size == 0 or file_counter == len(excel_files):
-            df_chunk = pd.DataFrame(all_results)
-            out_path = os.path.join(args.output_folder, f"all_MS_U13_part{chunk_counter}.xlsx")
-            df_chunk.to_excel(out_path, index=False)
-            tqdm.write(f"Saved chunk: {out_path}")
-            all_results = []
-            chunk_counter += 1
-
-    # Create master file 
-    parts = sorted(glob.glob(os.path.join(args.output_folder, "all_MS_U13_part*.xlsx")), key=natkey)
-    if parts:
-        master_df = pd.concat((pd.read_excel(p) for p in parts), ignore_index=True)
-        master_out = os.path.join(args.output_folder, "all_MS_U13.xlsx")
+        if len(names) == args.chunk_size or file_counter == len(new_files):
+            frames[chunk] = pd.concat(parts + [rows_frame(all_results)], ignore_index=True)
+            write_chunk(out, chunk, frames[chunk], anon)
+            manifest["chunks"][chunk] = names
+            save_manifest(out, manifest)
+            chunk = f"{CHUNK_PREFIX}{chunk_number(chunk) + 1}.{fmt}"
+            names, parts, all_results = [], [], []
+
+    remove_stale_chunks(out, manifest["chunks"])
+    if anon is not None:
+        remove_stale_chunks(anon[0], manifest["chunks"])
+
+    # Create master file: chunks of this run from memory, the others from disk
+    # (cheap for Parquet), Excel only as optional export
+    if manifest["chunks"]:
+        master_df = pd.concat((frames[c] if c in frames else read_chunk(out, c) for c in manifest["chunks"]),
+                              ignore_index=True)
+        write_table(master_df, master_out)
         tqdm.write(f"Master file created: {master_out}")
-        master_df.to_excel(master_out, index=False)
+        if args.excel_master and fmt != "xlsx":
+            write_table(master_df, excel_out)
+            tqdm.write(f"Excel master file created: {excel_out}")
+        if anon is not None:
+            # chunks of earlier runs without anonymised copy (stage newly enabled)
+            for c in manifest["chunks"]:
+                if c not in frames and not os.path.isfile(os.path.join(anon[0], c)):
+                    write_table(anonymize(read_chunk(out, c), anon[1]), os.path.join(anon[0], c))
+            anon_df = anonymize(master_df, anon[1])
+            write_table(anon_df, os.path.join(anon[0], os.path.basename(master_out)))
+            if args.excel_master and fmt != "xlsx":
+                write_table(anon_df, os.path.join(anon[0], os.path.basename(excel_out)))
+            save_mapping(anon[2], anon[1])
+            tqdm.write(f"Anonymised files saved in: {anon[0]}")
+    save_manifest(out, manifest)
 
     tqdm.write("Done! All chunks and master file saved.")
 
@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+
+# Manifest of the parsed exports ("parse_manifest.json" in the output folder):
+#   files:  export file name -> size, mtime_ns, sha256 and the chunk that holds its rows
+#   chunks: chunk file name -> export file names in the chunk (in order)
+# A rerun only parses exports that are new or whose content changed.
+# The manifest is written after every chunk, so an interrupted run can be resumed.
+
+MANIFEST_NAME = "parse_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_entry(path, chunk):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_sha256(path), "chunk": chunk}
+
+
+def empty_manifest(sheet_name, fmt):
+    return {"version": MANIFEST_VERSION, "sheet_name": sheet_name, "format": fmt, "files": {}, "chunks": {}}
+
+
+def load_manifest(folder, sheet_name, fmt):
+    """Manifest of the output folder, empty if missing or written for another sheet or format."""
+    try:
+        with open(os.path.join(folder, MANIFEST_NAME), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return empty_manifest(sheet_name, fmt)
+    if (manifest.get("version") != MANIFEST_VERSION or manifest.get("sheet_name") != sheet_name
+            or manifest.get("format", "xlsx") != fmt):
+        return empty_manifest(sheet_name, fmt)
+    return manifest
+
+
+def save_manifest(folder, manifest):
+    path = os.path.join(folder, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)  # never leaves a half-written manifest
+
+
+def classify(manifest, files):
+    """Splits the export paths into (new, changed) paths and removed file names.
+    Files that were only touched (same content) get their new mtime."""
+    new, changed = [], []
+    for path in files:
+        entry = manifest["files"].get(os.path.basename(path))
+        if entry is None:
+            new.append(path)
+            continue
+        stat = os.stat(path)
+        if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            continue
+        if entry["size"] == stat.st_size and entry["sha256"] == file_sha256(path):
+            entry["mtime_ns"] = stat.st_mtime_ns
+            continue
+        changed.append(path)
+    names = {os.path.basename(p) for p in files}
+    removed = [name for name in manifest["files"] if name not in names]
+    return new, changed, removed
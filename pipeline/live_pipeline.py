@@ -0,0 +1,138 @@
+import argparse
+import glob
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("macro", "parser", "statistics"):
+    sys.path.insert(0, os.path.join(BASE_DIR, folder))
+from export_watcher import ExportWatcher
+from draw_parser import file_id, natkey, parse_file, rows_frame
+from anonymization import MAPPING_NAME, anonymize, check_mapping_path, load_mapping, save_mapping
+from draw_statistics import draw_numbers
+from evaluation_store import write_evaluation
+from incremental_statistics import IncrementalEvaluation
+
+# Live pipeline: every export of draw_macro.py (or headless_draw.py) goes through
+# parser -> anonymisation -> draw statistics as soon as it is written,
+# instead of running draw_parser, anonymization and draw_statistics one after the other.
+# - export_watcher.py reports finished exports (background thread)
+# - parse_file reads the export, the persisted mapping of anonymization.py anonymises it
+# - IncrementalEvaluation updates the counters of the evaluation
+# Every write_every seconds (if something changed) the draws and the evaluation are written.
+
+DRAWS_NAME = "live_draws.parquet"
+EVALUATION_NAME = "evaluation_live"
+STOP_WORDS = ["WC", "St.", "Standings", "0", "Pl.", "BYE", "Freilos"]
+
+
+class LivePipeline:
+
+    def __init__(self, output_folder, sheet_name, mapping_path=None, fmt="parquet", excel=False):
+        """mapping_path: anonymisation mapping (private location, not in output_folder), None = real names."""
+        self.output_folder = output_folder
+        self.sheet_name = sheet_name
+        self.fmt = fmt
+        self.excel = excel
+        self.mapping_path = mapping_path
+        if mapping_path is not None:
+            check_mapping_path(mapping_path, output_folder)
+        self.mapping = load_mapping(mapping_path) if mapping_path is not None else None
+        self.evaluation = IncrementalEvaluation()
+        self.lock = threading.Lock()
+        self.changed = False
+
+        # continue with the draws of an earlier run
+        draws_path = os.path.join(output_folder, DRAWS_NAME)
+        self.frames = [pd.read_parquet(draws_path)] if os.path.isfile(draws_path) else []
+        if self.frames:
+            self.evaluation.add_draws(self.frames[0])
+
+    def known(self, path):
+        draw_nr = draw_numbers(pd.Series([file_id(path)])).iat[0]
+        return pd.notna(draw_nr) and int(draw_nr) in self.evaluation.draws
+
+    def handle(self, path):
+        """Export -> rows -> anonymised rows -> evaluation (called in the watcher thread)."""
+        rows = parse_file(path, STOP_WORDS, self.sheet_name)
+        if not rows:
+            raise ValueError("no players found in the export")
+        df = rows_frame(rows)
+        with self.lock:
+            if self.mapping is not None:
+                df = anonymize(df, self.mapping)
+            if self.evaluation.add_draw(df):
+                self.frames.append(df)
+                self.changed = True
+
+    def flush(self):
+        """Writes draws, mapping and evaluation if something changed. Returns the number of draws."""
+        with self.lock:
+            if not self.changed:
+                return None
+            draws = pd.concat(self.frames, ignore_index=True)
+            self.frames = [draws]
+            sheets = self.evaluation.sheets()
+            self.changed = False
+            n_draws = len(self.evaluation.draws)
+            mapping = {col: dict(values) for col, values in self.mapping.items()} if self.mapping is not None else None
+
+        draws.to_parquet(os.path.join(self.output_folder, DRAWS_NAME), index=False)
+        if mapping is not None:
+            save_mapping(self.mapping_path, mapping)
+        write_evaluation(sheets, os.path.join(self.output_folder, EVALUATION_NAME), fmt=self.fmt, excel=self.excel)
+        return n_draws
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse, anonymise and evaluate draws as soon as they are exported.")
+    parser.add_argument("--watch_folder", default=r"D:\Maturaarbeit\Draws", help="Folder with the BTP exports")
+    parser.add_argument("--output_folder", default=r"D:\Maturaarbeit\live", help="Folder for draws and evaluation")
+    parser.add_argument("--sheet_name", default="HE U13-Hauptfeld", help="Excel sheet name to parse")
+    parser.add_argument("--write_every", type=float, default=2.0, help="Seconds between two writes of the evaluation")
+    parser.add_argument("--mapping", default=os.path.join(r"D:\Maturaarbeit\all_MS_U13_parts_real_names", MAPPING_NAME),
+                        help="Anonymisation mapping, kept with the real names (never in --output_folder)")
+    parser.add_argument("--real_names", action="store_true", help="Do not anonymise")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet", help="Format of the evaluation")
+    parser.add_argument("--excel", action="store_true", help="Additionally write the evaluation as Excel (slow)")
+    parser.add_argument("--timeout", type=float, default=20, help="Seconds until a broken export is reported")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_folder, exist_ok=True)
+    if not args.real_names:
+        os.makedirs(os.path.dirname(os.path.abspath(args.mapping)), exist_ok=True)
+    pipeline = LivePipeline(args.output_folder, args.sheet_name, None if args.real_names else args.mapping,
+                            fmt=args.format, excel=args.excel)
+    print(f"{len(pipeline.evaluation.draws)} draws of earlier runs loaded.")
+
+    def failed(path, reason):
+        print(f"Error: {os.path.basename(path)} skipped: {reason}")
+
+    watcher = ExportWatcher(args.watch_folder, pipeline.handle, failed, timeout=args.timeout, pattern="*.xlsx")
+
+    # exports that are already in the folder but not in the evaluation yet
+    backlog = [p for p in sorted(glob.glob(os.path.join(args.watch_folder, "*.xlsx")), key=natkey)
+               if not pipeline.known(p)]
+    for path in backlog:
+        watcher.expect(path)
+    print(f"Watching {args.watch_folder} ({watcher.backend}), {len(backlog)} exports in the backlog. Stop with Ctrl + C.")
+
+    try:
+        while True:
+            time.sleep(args.write_every)
+            n_draws = pipeline.flush()
+            if n_draws is not None:
+                print(f"Evaluation updated: {n_draws} draws")
+    except KeyboardInterrupt:
+        print("Stopping...")
+    watcher.close(timeout=args.timeout)
+    pipeline.flush()
+    print(f"Done. Evaluation in {os.path.join(args.output_folder, EVALUATION_NAME)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import numpy as np
+
+# Adaptive Monte Carlo: simulate in batches until every player-group probability is
+# precise enough (standard error <= tol) or max_draws is reached.
+# Cells that are impossible because of the seed rules have no error.
+# For cells that were never (or always) hit, the error is estimated with (count + 0.5) / (n + 1),
+# so that they do not stop the simulation too early.
+
+
+def standard_errors(counts, n, possible):
+    p = counts / n
+    p_safe = np.where((counts == 0) | (counts == n), (counts + 0.5) / (n + 1), p)
+    return np.where(possible, np.sqrt(p_safe * (1 - p_safe) / n), 0.0)
+
+
+def adaptive_probabilities(sampler, rng, tol=0.002, batch_size=2000, min_draws=2000, max_draws=200_000):
+    """Returns (probabilities, standard errors, number of draws), players x groups."""
+    possible = (sampler.allowed[:, None] & sampler.bits[None, :]) > 0
+    counts = np.zeros(possible.shape, dtype=np.int64)
+    n = 0
+    se = np.full(possible.shape, np.inf)
+    while n < max_draws:
+        step = min(batch_size, max_draws - n)
+        counts += sampler.counts(step, rng)
+        n += step
+        se = standard_errors(counts, n, possible)
+        if n >= min_draws and se.max() <= tol:
+            break
+    if se.max() > tol:
+        print(f"Monte Carlo stopped at {n} draws, max. standard error {se.max():.4f} > {tol}")
+    return counts / n, se, n
@@ -1,52 +1,159 @@
 import pandas as pd
+import numpy as np
 import glob
+import json
 import os
+import sys
+from scipy.stats import t as t_dist
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "statistics"))
+from workbook_cache import read_sheet
+
+# Incremental summary over the analysis parts (one part = 200 draws).
+# A small state file keeps per (Player, Group) and numeric column:
+# n (number of parts with a value), sum and sum of squares.
+# Only new part files are read, mean, variance and 95% CI across parts follow from the sums.
+# If an already ingested part changed or was removed, the state is rebuilt from all parts.
 
 # folder path
 folder_path = r"D:\Maturaarbeit\analysis_results"
+output_path = r"D:\Maturaarbeit\analysis_results\analysis_summary.xlsx"
+state_path = os.path.join(folder_path, "analysis_summary_state.json")
 
-# find all Excel files
-files = glob.glob(os.path.join(folder_path, "analysis_evaluation_all_MS_U13_part*.xlsx"))
+# True -> additionally write all rows of all parts (slow for many parts)
+EXPORT_ALL_DATA = False
 
-print(f"{len(files)} Files found.")
+STATE_VERSION = 1
+KEYS = ["Player", "Group"]
+STATS = ["n", "sum", "sumsq"]
 
-# read files
-dfs = []
-for f in files:
-    df = pd.read_excel(f)
-    df["source_file"] = os.path.basename(f)  
-    dfs.append(df)
 
-# join
-data = pd.concat(dfs, ignore_index=True)
+def file_signature(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
 
-print("Columns:", data.columns.tolist())
-print("Shape:", data.shape)
 
-# Overall average across all numerical columnsSpalten
-mean_values = data.mean(numeric_only=True)
-mean_df = mean_values.to_frame(name="Average")
+def empty_state():
+    return {"version": STATE_VERSION, "files": {}, "stats": None}
 
-# average per player and group
-mean_per_player_group = (
-    data.groupby(["Player", "Group"])
-        .mean(numeric_only=True)
-        .reset_index()
-)
 
-# average per player over all groups
-mean_per_player = (
-    data.groupby("Player")
-        .mean(numeric_only=True)
-        .reset_index()
-)
+def load_state(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return empty_state()
+    if state.get("version") != STATE_VERSION:
+        return empty_state()
+    if state["stats"] is not None:
+        stats = pd.DataFrame(state["stats"]["data"])
+        stats.index = pd.MultiIndex.from_tuples([tuple(i) for i in state["stats"]["index"]], names=KEYS)
+        stats.columns = pd.MultiIndex.from_tuples([tuple(c) for c in state["stats"]["columns"]])
+        state["stats"] = stats
+    return state
+
+
+def save_state(path, state):
+    stats = state["stats"]
+    data = {"version": STATE_VERSION, "files": state["files"], "stats": None}
+    if stats is not None:
+        data["stats"] = {
+            "index": [list(i) for i in stats.index],
+            "columns": [list(c) for c in stats.columns],
+            "data": stats.values.tolist(),
+        }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def part_statistics(df):
+    """n, sum and sum of squares per (Player, Group) of one part, vectorised."""
+    values = df.drop(columns=KEYS).select_dtypes(include="number")
+    keys = [df[k] for k in KEYS]
+    stats = pd.concat({
+        "n": values.notna().groupby(keys).sum(),
+        "sum": values.groupby(keys).sum(),
+        "sumsq": (values ** 2).groupby(keys).sum(),
+    }, axis=1)
+    stats.index.names = KEYS
+    return stats
+
+
+def summarise(stats):
+    """Mean, variance and 95% CI across parts from the running sums."""
+    n, s, ss = (stats[stat] for stat in STATS)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = s / n
+        var = (ss - n * mean ** 2) / (n - 1)
+        var = var.clip(lower=0).where(n > 1)
+        half = t_dist.ppf(0.975, n - 1) * np.sqrt(var / n)
+    return mean, var, mean - half, mean + half
+
+
+def main():
+    # find all Excel files
+    files = sorted(glob.glob(os.path.join(folder_path, "analysis_evaluation_all_MS_U13_part*.xlsx")))
+    print(f"{len(files)} Files found.")
+
+    state = load_state(state_path)
+    signatures = {os.path.basename(f): file_signature(f) for f in files}
+    changed = [name for name, sig in state["files"].items() if signatures.get(name) != sig]
+    if changed:
+        print(f"{len(changed)} parts changed or removed, summary is rebuilt.")
+        state = empty_state()
+
+    new_files = [f for f in files if os.path.basename(f) not in state["files"]]
+    print(f"{len(new_files)} new parts.")
+
+    # ingest only new parts (first sheet); every part is read once, so it is not cached
+    for f in new_files:
+        stats = part_statistics(pd.read_excel(f))
+        state["stats"] = stats if state["stats"] is None else state["stats"].add(stats, fill_value=0)
+        state["files"][os.path.basename(f)] = signatures[os.path.basename(f)]
+
+    if state["stats"] is None:
+        print("No data.")
+        return
+    save_state(state_path, state)
+
+    stats = state["stats"]
+    mean, var, ci_low, ci_high = summarise(stats)
+
+    # average per player and group (across parts)
+    mean_per_player_group = mean.reset_index()
+    mean_per_player_group.insert(2, "Parts", stats["n"].max(axis=1).values.astype(int))
+
+    # average per player over all groups
+    per_player = stats.groupby(level="Player").sum()
+    mean_per_player = (per_player["sum"] / per_player["n"]).reset_index()
+
+    # Overall average across all numerical columns
+    total = stats.sum()
+    mean_df = pd.DataFrame({
+        "Average": total["sum"] / total["n"],
+        "Variance": (total["sumsq"] - total["sum"] ** 2 / total["n"]) / (total["n"] - 1),
+        "Values": total["n"].astype(int),
+    })
+
+    ci = pd.concat({"low": ci_low, "high": ci_high}, axis=1).swaplevel(axis=1)
+    ci.columns = [f"{col}_{bound}" for col, bound in ci.columns]
+    ci = ci[[f"{col}_{bound}" for col in mean.columns for bound in ("low", "high")]]
+
+    # Create Excel file
+    with pd.ExcelWriter(output_path) as writer:
+        if EXPORT_ALL_DATA:
+            # all parts on every run: the workbook cache pays off here
+            data = pd.concat((read_sheet(f).assign(source_file=os.path.basename(f)) for f in files),
+                             ignore_index=True)
+            data.to_excel(writer, sheet_name="All Data", index=False)
+        mean_df.to_excel(writer, sheet_name="Overall average", index=True)
+        mean_per_player_group.to_excel(writer, sheet_name="player_group", index=False)
+        var.reset_index().to_excel(writer, sheet_name="player_group_variance", index=False)
+        ci.reset_index().to_excel(writer, sheet_name="player_group_ci95", index=False)
+        mean_per_player.to_excel(writer, sheet_name="player", index=False)
+
+    print(f"Results saved under: {output_path}")
 
-# Create Excel file
-output_path = r"D:\Maturaarbeit\analysis_results\analysis_summary.xlsx"
-with pd.ExcelWriter(output_path) as writer:
-    data.to_excel(writer, sheet_name="All Data", index=False)
-    mean_df.to_excel(writer, sheet_name="Overall average", index=True)
-    mean_per_player_group.to_excel(writer, sheet_name="player_group", index=False)
-    mean_per_player.to_excel(writer, sheet_name="player", index=False)
 
-print(f"Results saved under: {output_path}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import numpy as np
+from scipy.stats import binom, beta as beta_dist, chi2, norm
+
+# Statistical tests for the whole player x group matrix at once.
+# All functions take arrays (broadcasting like NumPy) instead of single values.
+
+# two-sided binomial p-values per (k, n, p), shared by all files of a run
+_BINOM_CACHE = {}
+_RERR = 1 + 1e-7  # same relative tolerance as scipy.stats.binomtest
+
+
+def _binary_search(sign, d, lo, hi, n, p):
+    """Vectorised scipy.stats._binomtest._binary_search_for_binom_tst on a(x) = sign * pmf(x):
+    index i in [lo, hi] with a(i) <= d < a(i + 1)."""
+    lo, hi = lo.copy(), hi.copy()
+    found = np.full(len(lo), -1, dtype=np.int64)
+    active = lo < hi
+    while active.any():
+        mid = lo + (hi - lo) // 2
+        midval = sign * binom.pmf(mid, n, p)
+        less = active & (midval < d)
+        greater = active & (midval > d)
+        equal = active & ~less & ~greater
+        lo = np.where(less, mid + 1, lo)
+        hi = np.where(greater, mid - 1, hi)
+        found = np.where(equal, mid, found)
+        active = active & ~equal & (lo < hi)
+    result = np.where(sign * binom.pmf(lo, n, p) <= d, lo, lo - 1)
+    return np.where(found >= 0, found, result)
+
+
+def _binom_pvalues_exact(k, n, p):
+    """Two-sided p-values like scipy.stats.binomtest(k, n, p).pvalue for 1-d arrays:
+    the tail on the side of k plus the tail on the other side of the mean with all
+    outcomes that are at most as likely as k (found by binary search, like scipy)."""
+    d = binom.pmf(k, n, p)
+    mean = p * n
+    lower_side = k < mean
+    pval = np.ones(len(k))
+
+    lo = lower_side & (k != mean)
+    if lo.any():
+        kk, nn, pp, dd = k[lo], n[lo], p[lo], d[lo]
+        ix = _binary_search(-1.0, -dd * _RERR, np.ceil(pp * nn).astype(np.int64), nn, nn, pp)
+        y = nn - ix + (dd * _RERR == binom.pmf(ix, nn, pp))
+        pval[lo] = binom.cdf(kk, nn, pp) + binom.sf(nn - y, nn, pp)
+
+    up = ~lower_side & (k != mean)
+    if up.any():
+        kk, nn, pp, dd = k[up], n[up], p[up], d[up]
+        ix = _binary_search(1.0, dd * _RERR, np.zeros(len(kk), dtype=np.int64),
+                            np.floor(pp * nn).astype(np.int64), nn, pp)
+        pval[up] = binom.cdf(ix, nn, pp) + binom.sf(kk - 1, nn, pp)
+
+    return np.clip(pval, 0.0, 1.0)
+
+
+def binom_pvalues(k, n, p):
+    """Two-sided binomial test p-values for arrays k, n, p (broadcast)."""
+    k, n, p = np.broadcast_arrays(np.asarray(k, dtype=np.int64), np.asarray(n, dtype=np.int64),
+                                  np.asarray(p, dtype=float))
+    keys = list(zip(k.ravel().tolist(), n.ravel().tolist(), p.ravel().tolist()))
+    missing = list({key for key in keys if key not in _BINOM_CACHE})
+    if missing:
+        mk, mn, mp = (np.array(v) for v in zip(*missing))
+        for key, pval in zip(missing, _binom_pvalues_exact(mk, mn, mp)):
+            _BINOM_CACHE[key] = float(pval)
+    return np.array([_BINOM_CACHE[key] for key in keys]).reshape(k.shape)
+
+
+def binomial_bands(n, p, alpha=0.05):
+    """Exact acceptance band for counts ~ Binomial(n, p) (the marginal of a multinomial):
+    alpha/2 and 1 - alpha/2 quantiles, replaces percentiles of bootstrap draws."""
+    n, p = np.broadcast_arrays(np.asarray(n, dtype=float), np.asarray(p, dtype=float))
+    lower = binom.ppf(alpha / 2, n, p)
+    upper = binom.ppf(1 - alpha / 2, n, p)
+    return np.nan_to_num(lower), np.nan_to_num(upper)
+
+
+def wilson_intervals(x, n, alpha=0.05):
+    """Wilson score intervals for the observed portion x/n (arrays)."""
+    x, n = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(n, dtype=float))
+    z = norm.ppf(1 - alpha / 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p_hat = x / n
+        denom = 1 + z * z / n
+        center = (p_hat + z * z / (2 * n)) / denom
+        half = (z / denom) * np.sqrt(p_hat * (1 - p_hat) / n + z * z / (4 * n * n))
+    lo = np.where(n == 0, 0.0, np.maximum(0.0, center - half))
+    hi = np.where(n == 0, 0.0, np.minimum(1.0, center + half))
+    return lo, hi
+
+
+def jeffreys_intervals(x, n, alpha=0.05):
+    """Jeffreys intervals for the observed portion x/n (arrays)."""
+    x, n = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(n, dtype=float))
+    a = x + 0.5
+    b = n - x + 0.5
+    lo = np.where(x == 0, 0.0, beta_dist.ppf(alpha / 2, a, b))
+    hi = np.where(x == n, 1.0, beta_dist.ppf(1 - alpha / 2, a, b))
+    lo = np.where(n == 0, 0.0, lo)
+    hi = np.where(n == 0, 0.0, hi)
+    return lo, hi
+
+
+def chisquare_rows(f_obs, f_exp, mask, match_sums=False):
+    """Chi² goodness of fit per row over the groups in mask.
+    match_sums=True scales the expected counts to the observed sum of the row.
+    Returns (chi2, p, cramers_v) per row, Cramér's V is NaN for k < 2 or n = 0."""
+    f_obs = np.asarray(f_obs, dtype=float)
+    f_exp = np.where(mask, np.asarray(f_exp, dtype=float), 0.0)
+    n = np.where(mask, f_obs, 0.0).sum(axis=1)
+    k = mask.sum(axis=1)
+    if match_sums:
+        exp_sum = f_exp.sum(axis=1)
+        scale = np.divide(n, exp_sum, out=np.ones_like(n), where=exp_sum > 0)
+        f_exp = f_exp * scale[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(mask, (f_obs - f_exp) ** 2 / f_exp, 0.0)
+        stat = terms.sum(axis=1)
+        pval = chi2.sf(stat, k - 1)
+        cramers = np.where((k > 1) & (n > 0), np.sqrt(stat / (n * (k - 1))), np.nan)
+    return stat, pval, cramers
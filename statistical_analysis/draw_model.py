@@ -0,0 +1,38 @@
+import pandas as pd
+
+# Draw rules of the U13 main draw, shared by the analysis modules
+
+# Fixed free slots ONLY for unseeded players
+FREE_SLOTS = {
+    "A": 2, "B": 2, "C": 2, "D": 2,
+    "E": 2, "F": 2, "G": 3, "H": 2,
+    "I": 3, "J": 3, "K": 3
+}
+
+# allowed groups for seeded players (one seed per group)
+SEED_GROUPS = {
+    1: ["A"],
+    2: ["B"],
+    "3/4": ["C", "D"],
+    "5/8": ["E", "F", "G", "H"],
+}
+
+# Seed parser
+def parser_seed(val):
+    if pd.isna(val):
+        return None
+    s = str(val).strip()
+    if s in ["3/4"]:
+        return "3/4"
+    if s in ["5/8"]:
+        return "5/8"
+    try:
+        return int(s)
+    except ValueError:
+        return None
+
+
+def seed_allowed_groups(seed, groups):
+    if seed in SEED_GROUPS:
+        return SEED_GROUPS[seed]
+    return groups
@@ -0,0 +1,221 @@
+import itertools
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from draw_model import seed_allowed_groups
+
+# Exact player x group probabilities under the null model
+# "every valid draw is equally likely" (seed rules, group sizes, club separation).
+#
+# Idea: the seeded players are enumerated (at most a few dozen seed placements).
+# For a fixed seed placement, each club with several unseeded players (or with a
+# seeded club mate) chooses a set of distinct groups. The number of valid draws is
+# counted with a dynamic programme over the clubs whose state is the vector of
+# remaining free slots per group. Forward and backward tables give for every club
+# the probability to occupy each group. Players of a club are interchangeable, so
+# each of them gets that probability divided by the number of unseeded club mates.
+# All remaining players (own club, no seed in the club) fill the leftover slots.
+
+
+def _shift_slices(axes, n_axes):
+    """Slices for "one slot fewer in every group of axes"."""
+    src = tuple(slice(1, None) if a in axes else slice(None) for a in range(n_axes))
+    dst = tuple(slice(None, -1) if a in axes else slice(None) for a in range(n_axes))
+    return src, dst
+
+
+def _club_subsets(allowed, n_players, n_axes):
+    return [_shift_slices(set(s), n_axes) for s in itertools.combinations(allowed, n_players)]
+
+
+def _club_tables(capacities, club_players, blocked, free_players):
+    """Forward tables of the club DP for one seed placement, None if the players do not fit.
+
+    capacities: free slots per group (array)
+    club_players: {club: [players]} for clubs handled in the DP
+    blocked: {club: set(group index)} groups already taken by a seeded club mate
+    free_players: players without any club constraint
+    forward[c][state] = number of ways for the clubs before c to leave the free slots "state",
+    terminal[state] = weight of the free players filling the remaining slots."""
+    n_groups = len(capacities)
+    shape = tuple(int(c) + 1 for c in capacities)
+    n_unseeded = sum(len(p) for p in club_players.values()) + len(free_players)
+    if n_unseeded > capacities.sum():
+        return None
+
+    # If the slots are not filled completely, free players are handled like clubs
+    # of size one. Otherwise they are placed in closed form at the end.
+    club_players = dict(club_players)
+    if n_unseeded < capacities.sum():
+        for p in free_players:
+            club_players[("__free__", p)] = [p]
+        free_players = []
+
+    # biggest club first: its forward table is a single state, so it needs no dense pass
+    clubs_order = sorted(club_players, key=lambda c: -len(club_players[c]))
+    allowed_groups = [[g for g in range(n_groups) if g not in blocked.get(c, ())] for c in clubs_order]
+    transitions = [_club_subsets(allowed, len(club_players[c]), n_groups)
+                   for c, allowed in zip(clubs_order, allowed_groups)]
+
+    # forward pass
+    full = tuple(int(c) for c in capacities)
+    start = np.zeros(shape)
+    start[full] = 1.0
+    forward = [start]
+    for c, subsets in enumerate(transitions):
+        nxt = np.zeros(shape)
+        if c == 0:
+            for subset in itertools.combinations(allowed_groups[0], len(club_players[clubs_order[0]])):
+                state = list(full)
+                for g in subset:
+                    state[g] -= 1
+                if min(state) >= 0:
+                    nxt[tuple(state)] += 1.0
+        else:
+            cur = forward[-1]
+            for src, dst in subsets:
+                nxt[dst] += cur[src]
+        forward.append(nxt)
+
+    # terminal weight: free players fill all remaining slots,
+    # m! / prod(r_g!) ways (m! is constant and dropped)
+    grids = np.indices(shape)
+    terminal = np.ones(shape)
+    if free_players:
+        fact = np.array([float(np.prod(np.arange(1, k + 1))) for k in range(max(shape))])
+        for g in range(n_groups):
+            terminal = terminal / fact[grids[g]]
+    return {"clubs_order": clubs_order, "club_players": club_players, "free_players": free_players,
+            "allowed_groups": allowed_groups, "transitions": transitions, "forward": forward,
+            "terminal": terminal, "grids": grids, "full": full}
+
+
+def _unseeded_probabilities(capacities, club_players, blocked, free_players):
+    """Counts the valid placements of the unseeded players for one seed placement
+    (arguments see _club_tables). Returns (weight, {player: probability vector})."""
+    tables = _club_tables(capacities, club_players, blocked, free_players)
+    if tables is None:
+        return 0.0, {}
+    n_groups = len(capacities)
+    clubs_order, club_players, free_players = tables["clubs_order"], tables["club_players"], tables["free_players"]
+    allowed_groups, transitions, forward = tables["allowed_groups"], tables["transitions"], tables["forward"]
+    terminal, grids, full = tables["terminal"], tables["grids"], tables["full"]
+
+    # backward pass (not needed for the first club)
+    backward = [terminal]
+    for subsets in reversed(transitions[1:]):
+        nxt = backward[-1]
+        cur = np.zeros(terminal.shape)
+        for src, dst in subsets:
+            cur[src] += nxt[dst]
+        backward.append(cur)
+    backward.reverse()  # backward[c] belongs to the state after club c
+
+    weight = float((forward[-1] * terminal).sum())
+    if weight == 0:
+        return 0.0, {}
+
+    probs = {}
+    for c, club in enumerate(clubs_order):
+        n_c = len(club_players[club])
+        occupied = np.zeros(n_groups)
+        subsets = itertools.combinations(allowed_groups[c], n_c)
+        if c == 0:
+            for subset in subsets:
+                state = list(full)
+                for g in subset:
+                    state[g] -= 1
+                if min(state) >= 0:
+                    occupied[list(subset)] += backward[0][tuple(state)]
+        else:
+            for subset, (src, dst) in zip(subsets, transitions[c]):
+                occupied[list(subset)] += float((forward[c][src] * backward[c][dst]).sum())
+        for p in club_players[club]:
+            probs[p] = occupied / weight / n_c
+
+    if free_players:
+        final = forward[-1] * terminal
+        expected_free = np.array([(final * grids[g]).sum() for g in range(n_groups)]) / weight
+        for p in free_players:
+            probs[p] = expected_free / len(free_players)
+
+    return weight, probs
+
+
+def _seed_placements(seed_map, groups):
+    """All placements of the seeded players (one seed per group)."""
+    by_seed = defaultdict(list)
+    for p, s in seed_map.items():
+        if s is not None:
+            by_seed[s].append(p)
+
+    options = []
+    for s, players in by_seed.items():
+        allowed = seed_allowed_groups(s, groups)
+        options.append([dict(zip(players, perm)) for perm in itertools.permutations(allowed, len(players))])
+
+    for combo in itertools.product(*options):
+        placement = {}
+        for part in combo:
+            placement.update(part)
+        if len(set(placement.values())) == len(placement):
+            yield placement
+
+
+_RESULTS = {}
+
+
+def exact_group_probabilities(seed_map, free_slots, clubs):
+    """Exact probability of every player to land in every group if all valid
+    draws are equally likely. Returns a DataFrame (players x groups).
+    Results are memoised, the part files of one dataset share the same players."""
+    key = (tuple(seed_map.items()), tuple(free_slots.items()), tuple(clubs[p] for p in seed_map))
+    if key not in _RESULTS:
+        _RESULTS[key] = _exact_group_probabilities(seed_map, free_slots, clubs)
+    return _RESULTS[key].copy()
+
+
+def _exact_group_probabilities(seed_map, free_slots, clubs):
+    groups = list(free_slots.keys())
+    g_index = {g: i for i, g in enumerate(groups)}
+    capacities = np.array([free_slots[g] for g in groups])
+
+    unseeded = [p for p, s in seed_map.items() if s is None]
+    club_members = defaultdict(list)
+    for p in unseeded:
+        club_members[clubs[p]].append(p)
+    seed_clubs = {clubs[p] for p, s in seed_map.items() if s is not None}
+
+    club_players = {c: ps for c, ps in club_members.items() if len(ps) > 1 or c in seed_clubs}
+    free_players = [p for c, ps in club_members.items() if c not in club_players for p in ps]
+
+    cache = {}
+    total_weight = 0.0
+    unseeded_probs = {p: np.zeros(len(groups)) for p in unseeded}
+    seeded_probs = {p: np.zeros(len(groups)) for p, s in seed_map.items() if s is not None}
+
+    for placement in _seed_placements(seed_map, groups):
+        blocked = defaultdict(set)
+        for p, g in placement.items():
+            if clubs[p] in club_players:
+                blocked[clubs[p]].add(g_index[g])
+        key = tuple(sorted((c, tuple(sorted(gs))) for c, gs in blocked.items()))
+        if key not in cache:
+            cache[key] = _unseeded_probabilities(capacities, club_players, blocked, free_players)
+        weight, probs = cache[key]
+        if weight == 0:
+            continue
+
+        total_weight += weight
+        for p, g in placement.items():
+            seeded_probs[p][g_index[g]] += weight
+        for p, vec in probs.items():
+            unseeded_probs[p] += weight * vec
+
+    if total_weight == 0:
+        raise ValueError("No valid draw exists for these players, seeds and clubs.")
+
+    rows = {p: v / total_weight for p, v in {**seeded_probs, **unseeded_probs}.items()}
+    return pd.DataFrame.from_dict(rows, orient="index", columns=groups).reindex(list(seed_map.keys()))
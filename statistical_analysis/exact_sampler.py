@@ -0,0 +1,112 @@
+import itertools
+from collections import defaultdict
+
+import numpy as np
+
+from exact_probabilities import _club_tables, _seed_placements
+
+# Draws that are uniform over all valid draws (seed rules, group sizes, club separation),
+# the sampling counterpart of exact_probabilities.py (the MRVSampler is only approximately
+# uniform, its group probabilities differ by up to ~0.01).
+# - the seed placement is chosen with probability proportional to its number of valid draws
+# - the free slots after the last club are drawn from the final DP table, then the clubs are
+#   drawn backwards: the groups of club c with probability proportional to the number of ways
+#   the clubs before c reach the state before it (forward table)
+# - players of a club get the chosen groups in random order, free players the remaining slots
+# Many draws are sampled at once, the tables are built once per seed placement class.
+
+
+class ExactSampler:
+
+    def __init__(self, seed_map, free_slots, clubs):
+        self.players = list(seed_map.keys())
+        self.groups = list(free_slots.keys())
+        self.capacities = np.array([free_slots[g] for g in self.groups])
+        g_index = {g: i for i, g in enumerate(self.groups)}
+        p_index = {p: i for i, p in enumerate(self.players)}
+
+        unseeded = [p for p, s in seed_map.items() if s is None]
+        club_members = defaultdict(list)
+        for p in unseeded:
+            club_members[clubs[p]].append(p)
+        seed_clubs = {clubs[p] for p, s in seed_map.items() if s is not None}
+        self.club_players = {c: ps for c, ps in club_members.items() if len(ps) > 1 or c in seed_clubs}
+        self.free_players = [p for c, ps in club_members.items() if c not in self.club_players for p in ps]
+        self.p_index = p_index
+
+        # seed placements (player index -> group index) and their number of valid draws
+        self.placements, self.keys, self.blocked = [], [], {}  # key: seed placement class (blocked groups)
+        weights = {}
+        for placement in _seed_placements(seed_map, self.groups):
+            blocked = defaultdict(set)
+            for p, g in placement.items():
+                if clubs[p] in self.club_players:
+                    blocked[clubs[p]].add(g_index[g])
+            key = tuple(sorted((c, tuple(sorted(gs))) for c, gs in blocked.items()))
+            if key not in weights:
+                tables = _club_tables(self.capacities, self.club_players, blocked, self.free_players)
+                weights[key] = 0.0 if tables is None else float((tables["forward"][-1] * tables["terminal"]).sum())
+                self.blocked[key] = blocked
+            self.placements.append([(p_index[p], g_index[g]) for p, g in placement.items()])
+            self.keys.append(key)
+        self.weights = np.array([weights[k] for k in self.keys])
+        self.classes = list(weights)
+        self.placement_class = np.array([self.classes.index(k) for k in self.keys])
+        if self.weights.sum() == 0:
+            raise ValueError("No valid draw exists for these players, seeds and clubs.")
+
+    def _sample_unseeded(self, tables, result, rows, rng):
+        """Fills the unseeded players of result[rows] for one seed placement class."""
+        n = len(rows)
+        shape = tables["terminal"].shape
+        strides = np.array([int(np.prod(shape[g + 1:])) for g in range(len(shape))])
+
+        final = (tables["forward"][-1] * tables["terminal"]).ravel()
+        states = np.array(np.unravel_index(rng.choice(len(final), size=n, p=final / final.sum()), shape)).T
+        remaining = states.copy()
+
+        for c in range(len(tables["clubs_order"]) - 1, -1, -1):
+            players = [self.p_index[p] for p in tables["club_players"][tables["clubs_order"][c]]]
+            if c == 0:
+                # the first club starts from the full capacities: its groups are the used slots
+                used = np.asarray(tables["full"]) - states
+                chosen = np.sort(np.argsort(-used, axis=1, kind="stable")[:, :len(players)], axis=1)
+            else:
+                combos = np.array(list(itertools.combinations(tables["allowed_groups"][c], len(players))))
+                indicator = np.zeros((len(combos), len(shape)), dtype=np.int64)
+                np.put_along_axis(indicator, combos, 1, axis=1)
+                # state before club c = state + indicator, possible if no group exceeds its capacity
+                full_groups = (states >= self.capacities).astype(np.int64)
+                valid = full_groups @ indicator.T == 0
+                index = states @ strides
+                before = np.where(valid, index[:, None] + (indicator @ strides)[None, :], 0)
+                weights = np.where(valid, tables["forward"][c].ravel()[before], 0.0)
+                cum = weights.cumsum(axis=1)
+                pick = (cum < rng.random(n)[:, None] * cum[:, -1:]).sum(axis=1)
+                chosen = combos[pick]
+                states = states + indicator[pick]
+            order = np.argsort(rng.random(chosen.shape), axis=1)
+            result[rows[:, None], np.array(players)[None, :]] = np.take_along_axis(chosen, order, axis=1)
+
+        free = [self.p_index[p] for p in tables["free_players"]]
+        if free:
+            # remaining slots (group g repeated remaining[g] times) in random order
+            ends = remaining.cumsum(axis=1)
+            slots = (np.arange(len(free))[None, :, None] >= ends[:, None, :]).sum(axis=2)
+            order = np.argsort(rng.random(slots.shape), axis=1)
+            result[rows[:, None], np.array(free)[None, :]] = np.take_along_axis(slots, order, axis=1)
+
+    def sample(self, n_draws, rng):
+        """n_draws valid draws as int array (draws x players) with group indices."""
+        result = np.empty((n_draws, len(self.players)), dtype=np.int8)
+        placement = rng.choice(len(self.placements), size=n_draws, p=self.weights / self.weights.sum())
+        for i in np.unique(placement):
+            for p, g in self.placements[i]:
+                result[placement == i, p] = g
+
+        draw_class = self.placement_class[placement]
+        for code in np.unique(draw_class):
+            key = self.classes[code]
+            tables = _club_tables(self.capacities, self.club_players, self.blocked[key], self.free_players)
+            self._sample_unseeded(tables, result, np.flatnonzero(draw_class == code), rng)
+        return result
@@ -0,0 +1,103 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Global randomness test over the whole player x group table:
+# - T_chi2: Pearson Chi² summed over all cells (one number for the whole table)
+# - T_maxz: largest |z| of all cells, z = (observed - n*p) / sqrt(n*p*(1-p))
+# Both are calibrated against null tables built from valid draws of the MRVSampler:
+# every null table gets its own fresh draws (same draws for all players, so the dependence
+# between players is kept). Observed and null tables are then exchangeable under the null
+# model, also with the Monte Carlo noise of the probabilities.
+# The null tables run on a process pool, each with its own SeedSequence child.
+# The max-|z| distribution also gives per-cell p-values adjusted for multiple testing
+# (single-step max-T), Benjamini-Hochberg q-values are computed from the binomial p-values.
+
+
+def bh_adjust(pvalues):
+    """Benjamini-Hochberg q-values, NaN stays NaN."""
+    p = np.asarray(pvalues, dtype=float)
+    flat = p.ravel()
+    valid = ~np.isnan(flat)
+    q = np.full(flat.shape, np.nan)
+    pv = flat[valid]
+    m = len(pv)
+    if m:
+        order = np.argsort(pv)
+        ranked = pv[order] * m / np.arange(1, m + 1)
+        ranked = np.minimum.accumulate(ranked[::-1])[::-1]
+        out = np.empty(m)
+        out[order] = np.minimum(ranked, 1.0)
+        q[valid] = out
+    return q.reshape(p.shape)
+
+
+def table_statistics(tables, totals, probs):
+    """Returns (T_chi2, z) for one table (players x groups) or a stack of tables."""
+    expected = totals[:, None] * probs
+    informative = (probs > 0) & (probs < 1) & (totals[:, None] > 0)
+    safe_exp = np.where(informative, expected, 1.0)
+    safe_std = np.sqrt(np.where(informative, expected * (1 - probs), 1.0))
+    chi = np.where(informative, (tables - expected) ** 2 / safe_exp, 0.0).sum(axis=(-2, -1))
+    z = np.where(informative, (tables - expected) / safe_std, 0.0)
+    return chi, z
+
+
+def _null_statistics(sampler, totals, probs, seed_seqs):
+    """T_chi2 and max |z| of one fresh null table per SeedSequence (runs in a worker)."""
+    n_max = int(totals.max())
+    chi_null, max_null = np.empty(len(seed_seqs)), np.empty(len(seed_seqs))
+    for i, seed_seq in enumerate(seed_seqs):
+        draws = sampler.sample(n_max, np.random.default_rng(seed_seq))
+        table = np.stack([np.bincount(draws[:totals[p], p], minlength=len(sampler.groups))
+                          for p in range(len(sampler.players))])
+        chi, z = table_statistics(table, totals, probs)
+        chi_null[i], max_null[i] = chi, np.abs(z).max()
+    return chi_null, max_null
+
+
+def global_test(sampler, observed, probabilities, rng, n_null=1000, workers=None, tables_per_task=20):
+    """observed (counts) and probabilities: DataFrames players x groups.
+    probabilities must be those of the sampler (e.g. its Monte Carlo estimate), otherwise
+    the statistics and their null distribution belong to different models.
+    workers=1 runs everything in the current process.
+    Returns (summary dict, z DataFrame, max-T adjusted p-value DataFrame)."""
+    players, groups = sampler.players, sampler.groups
+    counts = observed.reindex(index=players, columns=groups, fill_value=0).values
+    probs = probabilities.reindex(index=players, columns=groups, fill_value=0).values
+    totals = counts.sum(axis=1)
+
+    chi_obs, z_obs = table_statistics(counts, totals, probs)
+    abs_z = np.abs(z_obs)
+
+    children = np.random.SeedSequence(int(rng.integers(2 ** 63))).spawn(n_null)
+    tasks = [children[i:i + tables_per_task] for i in range(0, n_null, tables_per_task)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        results = [_null_statistics(sampler, totals, probs, t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            futures = [pool.submit(_null_statistics, sampler, totals, probs, t) for t in tasks]
+            results = [future.result() for future in futures]
+    chi_null = np.concatenate([chi for chi, _ in results])
+    max_null = np.sort(np.concatenate([m for _, m in results]))
+
+    # share of null tables at least as extreme (+1: observed table counts as one of them)
+    exceed = len(max_null) - np.searchsorted(max_null, abs_z, side="left")
+    p_adjusted = (exceed + 1) / (n_null + 1)
+
+    summary = {
+        "Players": len(players),
+        "Null_tables": n_null,
+        "Chi2_global": chi_obs,
+        "Chi2_null_mean": chi_null.mean(),
+        "p_chi2_global": ((chi_null >= chi_obs).sum() + 1) / (n_null + 1),
+        "Max_abs_z": abs_z.max(),
+        "Max_abs_z_null_95%": np.quantile(max_null, 0.95),
+        "p_max_z": ((max_null >= abs_z.max()).sum() + 1) / (n_null + 1),
+    }
+    index = pd.Index(players, name="Player")
+    return (summary, pd.DataFrame(z_obs, index=index, columns=groups),
+            pd.DataFrame(p_adjusted, index=index, columns=groups))
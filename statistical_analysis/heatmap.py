@@ -3,6 +3,11 @@ import numpy as np
 import plotly.graph_objects as go
 import argparse
 import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, "statistics"))
+from workbook_cache import read_sheet, read_sheet_with
 
 
 parser = argparse.ArgumentParser(description="Generate heatmaps from simulation results.")
@@ -12,25 +17,95 @@ parser.add_argument(
     default=r"D:\Maturaarbeit\analysis_results\analysis_evaluation_all_MS_U13.xlsx",
     help="Path to the Excel file with simulation results (default: standard file)"
 )
-parser.add_argument("--pairs_file", help="Optional Excel file with pairings (sheet 'Pairs of 2')", default=None)
+parser.add_argument("--pairs_file", default=r"D:\Maturaarbeit\evaluations\evaluation_all_MS_U13",
+                    help="Evaluation (folder or Excel file) with the sheet 'Pairs of 2'")
 parser.add_argument("--outdir", default=".", help="Output directory for saving plots")
+parser.add_argument("--render", choices=["html", "png"], default="html",
+                    help="html: interactive Plotly, png: small static image (matplotlib)")
+parser.add_argument("--annotate_limit", type=int, default=60,
+                    help="No numbers in the cells if there are more players than this")
 args = parser.parse_args()
 
-
-# Load Excel
+# colours of the seeded layer (r, g, b, alpha)
+SEEDED_COLOR = (245, 245, 220, 1.0)
+PAIR_SEEDED_COLOR = (200, 200, 200, 0.4)
+
+
+def render_heatmap(name, title, values, seeded, x, y, colorscale, colorbar_title,
+                   zmin=None, zmax=None, zmid=None, text_format=".0f",
+                   hover="Player = %{y}<br>Group = %{x}<br>Value = %{z}", customdata=None,
+                   seeded_color=SEEDED_COLOR):
+    """values: matrix (NaN = no colour), seeded: bool matrix drawn as constant grey layer."""
+    annotate = len(y) <= args.annotate_limit
+    path = os.path.join(args.outdir, f"{name}.{args.render}")
+
+    if args.render == "png":
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        from matplotlib.colors import LinearSegmentedColormap, to_rgba
+
+        height = min(max(4, 0.18 * len(y) + 1.5), 20)
+        width = min(max(6, 0.18 * len(x) + 3), 24)
+        fig, ax = plt.subplots(figsize=(width, height))
+        image = ax.imshow(np.ma.masked_invalid(values.astype(float)), cmap=colorscale, vmin=zmin, vmax=zmax,
+                          aspect="auto", interpolation="nearest")
+        r, g, b, alpha = seeded_color
+        grey = LinearSegmentedColormap.from_list("seeded", [to_rgba((r / 255, g / 255, b / 255), alpha)] * 2)
+        ax.imshow(np.ma.masked_where(~seeded, np.ones(seeded.shape)), cmap=grey, aspect="auto",
+                  interpolation="nearest")
+        fig.colorbar(image, ax=ax, label=colorbar_title)
+        # at most ~80 labels per axis
+        x_every, y_every = max(1, len(x) // 80), max(1, len(y) // 80)
+        ax.set_xticks(range(0, len(x), x_every))
+        ax.set_xticklabels(list(x)[::x_every], rotation=90 if len(x) > 20 else 0, fontsize=6 if len(x) > 20 else 9)
+        ax.set_yticks(range(0, len(y), y_every))
+        ax.set_yticklabels(list(y)[::y_every], fontsize=6 if len(y) > 40 else 9)
+        if annotate:
+            for i, j in zip(*np.nonzero(~np.isnan(values))):
+                ax.text(j, i, format(values[i, j], text_format), ha="center", va="center", fontsize=6)
+        ax.set_title(title)
+        fig.tight_layout()
+        fig.savefig(path, dpi=100)
+        plt.close(fig)
+        return path
+
+    # float32 halves the size of the embedded (binary) arrays
+    values = values.astype(np.float32)
+    fig = go.Figure()
+    trace = dict(
+        z=values, x=x, y=y, colorscale=colorscale, zmin=zmin, zmax=zmax, zmid=zmid,
+        colorbar=dict(title=colorbar_title),
+        hovertemplate=hover + "<extra></extra>",
+    )
+    if customdata is not None:
+        customdata = customdata.astype(np.float32)
+        trace["customdata"] = customdata
+    if annotate:
+        trace["text"] = values
+        trace["texttemplate"] = "%{text:" + text_format + "}"
+    fig.add_trace(go.Heatmap(**trace))
+
+    fig.add_trace(go.Heatmap(
+        z=np.where(seeded, 1, np.nan).astype(np.float32),
+        x=x,
+        y=y,
+        zmin=1, zmax=1,
+        colorscale=[[0, "rgba(0,0,0,0)"], [1, "rgba({}, {}, {}, {})".format(*seeded_color)]],
+        showscale=False,
+        hoverinfo="skip" if customdata is None else None,
+        customdata=customdata,
+        hovertemplate=None if customdata is None else hover + "<extra></extra>",
+    ))
+    fig.update_layout(title=title)
+    fig.write_html(path, include_plotlyjs="cdn")
+    return path
+
+
+# Load Excel (header scan to find the sheet, data from the workbook cache)
 required_cols = {"Player", "Group", "Observed", "Expected_exact", "Expected_simulated"}
-xls = pd.ExcelFile(args.input_file)
-
-df = None
-for sheet_name in reversed(xls.sheet_names):
-    tmp = pd.read_excel(args.input_file, sheet_name=sheet_name)
-    if required_cols.issubset(tmp.columns):
-        df = tmp
-        print(f"Loaded data from sheet '{sheet_name}'")
-        break
-
-if df is None:
-    raise ValueError(f"No sheet found containing required columns: {required_cols}")
+sheet_name, df = read_sheet_with(args.input_file, required_cols)
+print(f"Loaded data from sheet '{sheet_name}'")
 
 
 # Heatmap 1: Observed players x groups
@@ -42,197 +117,65 @@ obs_pivot = (
       .sort_index()
 )
 deterministic_players = df.loc[df["Seed"].notna(), "Player"].unique()
-
-# Create matrices for unseeded and seeded players
-obs_unseeded = obs_pivot.copy()
-obs_unseeded.loc[deterministic_players, :] = np.nan  # seeded will not affect color
-
-obs_seeded = obs_pivot.copy()
-obs_seeded.loc[~obs_seeded.index.isin(deterministic_players), :] = np.nan  # keep only seeded
-
-# Max value for unseeded players (for color scaling)
-max_unseeded = np.nanmax(obs_unseeded.values)
-
-# Hovertext
-hover_text = np.empty(obs_pivot.shape, dtype=object)
-for i, player in enumerate(obs_pivot.index):
-    for j, group in enumerate(obs_pivot.columns):
-        val = obs_pivot.iloc[i, j]
-        if pd.isna(val):
-            hover_text[i, j] = f"Player = {player}<br>Group = {group}<br>Observed = –"
-        else:
-            hover_text[i, j] = f"Player = {player}<br>Group = {group}<br>Observed = {val}"
-
-display_text = np.empty(obs_pivot.shape, dtype=object)
-for i, player in enumerate(obs_pivot.index):
-    for j, group in enumerate(obs_pivot.columns):
-        val = obs_pivot.iloc[i, j]
-        display_text[i, j] = "" if pd.isna(val) else str(val)
-
-fig = go.Figure()
-
-# Layer 1: unseeded players
-fig.add_trace(go.Heatmap(
-    z=obs_unseeded.values,
-    x=obs_unseeded.columns,
-    y=obs_unseeded.index,
-    colorscale="Blues",
-    zmin=0,
-    zmax=max_unseeded,
-    colorbar=dict(title="Observed Count"),
-    text=display_text.tolist(),
-    texttemplate="%{text}",
-    customdata=hover_text.tolist(),
-    hovertemplate="%{customdata}<extra></extra>"
-))
-
-# Layer 2: seeded players
-fig.add_trace(go.Heatmap(
-    z=np.where(obs_seeded.notna(), 1, np.nan),
-    x=obs_seeded.columns,
-    y=obs_seeded.index,
-    zmin=1, zmax=1,
-    colorscale=[[0, 'rgba(0,0,0,0)'], [1, 'rgb(245, 245, 220)']],
-    text=None,
-    texttemplate="%{text}",
-    customdata=hover_text.tolist(),
-    hovertemplate="%{customdata}<extra></extra>",
-    showscale=False
-))
-
-fig.update_layout(title="Observed Distribution per Player (seeded players grey)")
-fig.write_html(os.path.join(args.outdir, "heatmap_observed.html"), include_plotlyjs="cdn")
+is_seeded = obs_pivot.index.isin(deterministic_players)
+seeded_cells = np.repeat(is_seeded[:, None], len(groups), axis=1)
+
+# unseeded players coloured, seeded players grey (they would dominate the colour scale)
+obs_values = obs_pivot.values.astype(float)
+obs_unseeded = np.where(seeded_cells, np.nan, obs_values)
+
+render_heatmap(
+    "heatmap_observed", "Observed Distribution per Player (seeded players grey)",
+    obs_unseeded, seeded_cells, obs_pivot.columns, obs_pivot.index, "Blues", "Observed Count",
+    zmin=0, zmax=np.nanmax(obs_unseeded),
+    hover="Player = %{y}<br>Group = %{x}<br>Observed = %{customdata}", customdata=obs_values,
+)
 
 # Heatmaps 2 and 3: Residuals (common z-limit for consistent color scale)
-
-resid_exact = df.assign(
-    Residual=df["Observed"] - df["Expected_exact"]
-).pivot(index="Player", columns="Group", values="Residual")
-
-resid_sim = df.assign(
-    Residual=df["Observed"] - df["Expected_simulated"]
-).pivot(index="Player", columns="Group", values="Residual")
+resid = {}
+for col in ["Expected_exact", "Expected_simulated"]:
+    resid[col] = (
+        df.assign(Residual=df["Observed"] - df[col])
+          .pivot_table(index="Player", columns="Group", values="Residual", aggfunc="sum")
+          .reindex(index=obs_pivot.index, columns=groups)
+          .values
+    )
 
 # compute common z-limit across both residual matrices
-zlim = float(np.nanmax(np.abs([resid_exact.values, resid_sim.values])))
-
-fig2 = go.Figure()
-
-# Layer 1: unseeded players (residuals exact)
-resid_exact_unseeded = resid_exact.copy()
-resid_exact_unseeded.loc[deterministic_players, :] = np.nan  # mask seeded
-fig2.add_trace(go.Heatmap(
-    z=resid_exact_unseeded.values,
-    x=resid_exact_unseeded.columns,
-    y=resid_exact_unseeded.index,
-    colorscale="RdBu",
-    zmid=0,
-    zmin=-zlim, zmax=zlim,     
-    colorbar=dict(title="Residual (Obs - Exp Exact)"),
-    text=resid_exact_unseeded.values,
-    texttemplate="%{text:.0f}",
-    hovertemplate="Player = %{y}<br>Group = %{x}<br>Residual = %{z}<extra></extra>"
-))
-
-# Layer 2: seeded players
-resid_exact_seeded = resid_exact.copy()
-resid_exact_seeded.loc[~resid_exact_seeded.index.isin(deterministic_players), :] = np.nan
-resid_exact_seeded.loc[deterministic_players, :] = 1  # constant value
-fig2.add_trace(go.Heatmap(
-    z=np.where(resid_exact_seeded.notna(), 1, np.nan),
-    x=resid_exact_seeded.columns,
-    y=resid_exact_seeded.index,
-    zmin=1, zmax=1,
-    colorscale=[[0, 'rgba(0,0,0,0)'], [1, 'rgb(245, 245, 220)']],
-    showscale=False,
-    hoverinfo="skip"
-))
-
-fig2.update_layout(title="Residuals: Observed - Expected (Exact)")
-fig2.write_html(os.path.join(args.outdir, "heatmap_observed-expected.html"), include_plotlyjs="cdn")
-
-# Heatmap 3: Observed vs Expected Simulated (residuals)
-fig3 = go.Figure()
-
-# Layer 1: unseeded players
-resid_sim_unseeded = resid_sim.copy()
-resid_sim_unseeded.loc[deterministic_players, :] = np.nan
-fig3.add_trace(go.Heatmap(
-    z=resid_sim_unseeded.values,
-    x=resid_sim_unseeded.columns,
-    y=resid_sim_unseeded.index,
-    colorscale="RdBu",
-    zmid=0,
-    zmin=-zlim, zmax=zlim,     # use same common z-limit
-    colorbar=dict(title="Residual (Obs - Exp Simulated)"),
-    text=resid_sim_unseeded.values,
-    texttemplate="%{text:.0f}",
-    hovertemplate="Player = %{y}<br>Group = %{x}<br>Residual = %{z}<extra></extra>"
-))
-
-# Layer 2: seeded players
-resid_sim_seeded = resid_sim.copy()
-resid_sim_seeded.loc[~resid_sim_seeded.index.isin(deterministic_players), :] = np.nan
-resid_sim_seeded.loc[deterministic_players, :] = 1
-fig3.add_trace(go.Heatmap(
-    z=np.where(resid_sim_seeded.notna(), 1, np.nan),
-    x=resid_sim_seeded.columns,
-    y=resid_sim_seeded.index,
-    zmin=1, zmax=1,
-    colorscale=[[0, 'rgba(0,0,0,0)'], [1, 'rgb(245, 245, 220)']],
-    showscale=False,
-    hoverinfo="skip"
-))
-
-fig3.update_layout(title="Residuals: Observed - Expected (Simulated)")
-fig3.write_html(os.path.join(args.outdir, "heatmap_observed-expected_simulated.html"), include_plotlyjs="cdn")
+zlim = float(np.nanmax(np.abs([resid["Expected_exact"], resid["Expected_simulated"]])))
+
+for col, name, label, title in [
+    ("Expected_exact", "heatmap_observed-expected", "Residual (Obs - Exp Exact)",
+     "Residuals: Observed - Expected (Exact)"),
+    ("Expected_simulated", "heatmap_observed-expected_simulated", "Residual (Obs - Exp Simulated)",
+     "Residuals: Observed - Expected (Simulated)"),
+]:
+    render_heatmap(
+        name, title, np.where(seeded_cells, np.nan, resid[col]), seeded_cells,
+        obs_pivot.columns, obs_pivot.index, "RdBu", label, zmin=-zlim, zmax=zlim, zmid=0,
+        hover="Player = %{y}<br>Group = %{x}<br>Residual = %{z}",
+    )
 
 # Heatmap 4: Player x Player pairings
-pair_df = pd.read_excel(
-    r"D:\Maturaarbeit\evaluations\evaluation_all_MS_U13.xlsx",
-    sheet_name="Pairs of 2"
+pair_df = read_sheet(args.pairs_file, "Pairs of 2")
+
+players = np.array(sorted(set(pair_df["Player 1"]).union(pair_df["Player 2"])))
+idx_a = np.searchsorted(players, pair_df["Player 1"].values)
+idx_b = np.searchsorted(players, pair_df["Player 2"].values)
+
+# symmetric matrix in one step
+matrix = np.zeros((len(players), len(players)))
+np.add.at(matrix, (idx_a, idx_b), pair_df["Count"].values)
+np.add.at(matrix, (idx_b, idx_a), pair_df["Count"].values)
+
+# grey layer for rows and columns of seeded players
+seeded_players = np.isin(players, deterministic_players)
+pair_mask = seeded_players[:, None] | seeded_players[None, :]
+
+render_heatmap(
+    "heatmap_pairs", "Player Pairings Heatmap (grey layer for seeded players)",
+    matrix, pair_mask, players, players, "Blues", "Times Together",
+    hover="Player 1 = %{y}<br>Player 2 = %{x}<br>Count = %{z}", seeded_color=PAIR_SEEDED_COLOR,
 )
 
-players = sorted(set(pair_df["Player 1"]).union(pair_df["Player 2"]))
-
-# Create empty symmetric matrix
-matrix = pd.DataFrame(0, index=players, columns=players)
-
-# Fill matrix with counts
-for _, row in pair_df.iterrows():
-    a, b, count = row["Player 1"], row["Player 2"], row["Count"]
-    matrix.loc[a, b] = count
-    matrix.loc[b, a] = count  # symmetric
-
-fig_pair = go.Figure()
-
-fig_pair.add_trace(go.Heatmap(
-    z=matrix.values,
-    x=matrix.columns,
-    y=matrix.index,
-    colorscale="Blues",
-    colorbar=dict(title="Times Together"),
-    text=matrix.values,
-    texttemplate="%{text}",
-    hovertemplate="Player 1 = %{y}<br>Player 2 = %{x}<br>Count = %{z}<extra></extra>"
-))
-
-# second layer for seeded players
-mask = pd.DataFrame(np.nan, index=players, columns=players)
-
-for p in deterministic_players:
-    if p in mask.index: 
-        mask.loc[p, :] = 1 
-        mask.loc[:, p] = 1 
-
-fig_pair.add_trace(go.Heatmap(
-    z=mask.values,
-    x=mask.columns,
-    y=mask.index,
-    colorscale=[[0, "rgba(0,0,0,0)"], [1, "rgba(200,200,200,0.4)"]],  
-    showscale=False,
-    hoverinfo="skip"
-))
-
-fig_pair.update_layout(title="Player Pairings Heatmap (grey layer for seeded players)")
-fig_pair.write_html(os.path.join(args.outdir, "heatmap_pairs.html"), include_plotlyjs="cdn")
+print(f"Heatmaps saved to {args.outdir}")
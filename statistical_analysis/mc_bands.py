@@ -0,0 +1,58 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Monte Carlo 95% bands of the counts per player and group.
+# Every series simulates sim_per_series draws and gives one count per (player, group).
+# Instead of keeping all series, only a histogram of these counts is accumulated
+# (counts are small integers 0..sim_per_series). Quantiles are read from the histogram
+# exactly, with the same linear interpolation as pandas' quantile().
+# The series run on a process pool, each with its own SeedSequence child.
+
+
+def _series_histogram(sampler, sim_per_series, seed_seqs):
+    """Runs several series in one worker and returns their count histogram."""
+    n_players, n_groups = len(sampler.players), len(sampler.groups)
+    hist = np.zeros((n_players, n_groups, sim_per_series + 1), dtype=np.int64)
+    p_idx, g_idx = np.indices((n_players, n_groups))
+    for seed_seq in seed_seqs:
+        counts = sampler.counts(sim_per_series, np.random.default_rng(seed_seq))
+        hist[p_idx, g_idx, counts] += 1
+    return hist
+
+
+def histogram_quantile(hist, q):
+    """Quantile q along the last axis of a count histogram (bin i = value i)."""
+    n = hist.sum(axis=-1)
+    cum = hist.cumsum(axis=-1)
+    h = (n - 1) * q
+    lo = np.floor(h).astype(np.int64)
+    hi = np.ceil(h).astype(np.int64)
+    # value of the k-th smallest element = number of bins whose cumulative count is <= k
+    v_lo = (cum <= lo[..., None]).sum(axis=-1)
+    v_hi = (cum <= hi[..., None]).sum(axis=-1)
+    return v_lo + (h - lo) * (v_hi - v_lo)
+
+
+def mc_count_bands(sampler, n_series, sim_per_series, seed=42, quantiles=(0.025, 0.975),
+                   workers=None, series_per_task=10):
+    """Returns one players x groups array per quantile.
+    workers=1 runs everything in the current process."""
+    children = np.random.SeedSequence(seed).spawn(n_series)
+    tasks = [children[i:i + series_per_task] for i in range(0, n_series, series_per_task)]
+    workers = workers or os.cpu_count() or 1
+
+    hist = None
+    if workers == 1 or len(tasks) == 1:
+        results = (_series_histogram(sampler, sim_per_series, t) for t in tasks)
+        for part in results:
+            hist = part if hist is None else hist + part
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            futures = [pool.submit(_series_histogram, sampler, sim_per_series, t) for t in tasks]
+            for future in futures:
+                part = future.result()
+                hist = part if hist is None else hist + part
+
+    return [histogram_quantile(hist, q) for q in quantiles]
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+from draw_model import seed_allowed_groups
+
+# Vectorised Monte Carlo with MRV heuristic (same rules as the old monte_carlo_mrv):
+# - the player with the smallest domain of valid groups is placed next (ties at random)
+# - seeded players: uniform over their allowed groups with a free seed slot
+# - unseeded players: weighted by the remaining free slots of the allowed groups
+# - no two players of the same club in one group
+# - a draw that runs into an empty domain is restarted
+#
+# Many draws are simulated at once. Domains are stored as bitmasks (bit g = group g
+# still possible) and updated incrementally after every placement.
+
+
+class MRVSampler:
+
+    def __init__(self, seed_map, free_slots, clubs, max_restarts=50, batch_size=20000):
+        self.players = list(seed_map.keys())
+        self.groups = list(free_slots.keys())
+        self.max_restarts = max_restarts
+        self.batch_size = batch_size
+
+        n_groups = len(self.groups)
+        g_index = {g: i for i, g in enumerate(self.groups)}
+        self.seeded = np.array([seed_map[p] is not None for p in self.players])
+        self.allowed = np.array([
+            sum(1 << g_index[g] for g in seed_allowed_groups(seed_map[p], self.groups))
+            for p in self.players
+        ], dtype=np.int32)
+        self.club_ids = pd.factorize(pd.Series([clubs[p] for p in self.players]))[0]
+        self.free_capacity = np.array([free_slots[g] for g in self.groups])
+        self.seed_capacity = np.ones(n_groups, dtype=int)
+
+        self.popcount = np.array([bin(i).count("1") for i in range(1 << n_groups)], dtype=np.int8)
+        self.bits = (1 << np.arange(n_groups)).astype(np.int32)
+
+    def _run_batch(self, n_draws, rng, enforce_clubs=True):
+        """Simulates n_draws draws. Returns (assignment (n_draws x players), failed)."""
+        n_players, n_groups = len(self.players), len(self.groups)
+        rows = np.arange(n_draws)
+
+        domains = np.tile(self.allowed, (n_draws, 1))
+        remaining = np.ones((n_draws, n_players), dtype=bool)
+        free_left = np.tile(self.free_capacity, (n_draws, 1))
+        seeds_left = np.tile(self.seed_capacity, (n_draws, 1))
+        assignment = np.full((n_draws, n_players), -1, dtype=np.int8)
+        failed = np.zeros(n_draws, dtype=bool)
+
+        for _ in range(n_players):
+            sizes = self.popcount[domains].astype(float)
+            failed |= ((sizes == 0) & remaining).any(axis=1)
+
+            # MRV: smallest domain first, random tie-break
+            key = np.where(remaining, sizes + rng.random((n_draws, n_players)), np.inf)
+            selected = key.argmin(axis=1)
+            sel_seeded = self.seeded[selected]
+
+            # choose a group of the selected player's domain
+            possible = (domains[rows, selected][:, None] & self.bits) > 0
+            weights = np.where(sel_seeded[:, None], 1, free_left) * possible
+            totals = weights.sum(axis=1)
+            weights[totals == 0, 0] = 1  # failed draws, result is discarded
+            cum = weights.cumsum(axis=1)
+            r = rng.random(n_draws) * cum[:, -1]
+            chosen = (cum < r[:, None]).sum(axis=1)
+
+            assignment[rows, selected] = chosen
+            remaining[rows, selected] = False
+            seeds_left[rows, chosen] -= sel_seeded
+            free_left[rows, chosen] -= ~sel_seeded
+
+            # remove the chosen group from the domains it is no longer valid for
+            left = np.where(sel_seeded, seeds_left[rows, chosen], free_left[rows, chosen])
+            clear = (self.seeded[None, :] == sel_seeded[:, None]) & (left <= 0)[:, None]
+            if enforce_clubs:
+                clear |= self.club_ids[None, :] == self.club_ids[selected][:, None]
+            domains = np.where(clear, domains & ~self.bits[chosen][:, None], domains)
+
+        return assignment, failed
+
+    def sample(self, n_draws, rng):
+        """n_draws valid draws as int array (draws x players) with group indices."""
+        result = np.empty((n_draws, len(self.players)), dtype=np.int8)
+        for start in range(0, n_draws, self.batch_size):
+            stop = min(start + self.batch_size, n_draws)
+            todo = np.arange(start, stop)
+            for _ in range(self.max_restarts):
+                assignment, failed = self._run_batch(len(todo), rng)
+                result[todo[~failed]] = assignment[~failed]
+                todo = todo[failed]
+                if len(todo) == 0:
+                    break
+            if len(todo):
+                # fallback (never happened during testing)
+                print(f"{len(todo)} simulations have softer rules.")
+                result[todo] = self._run_batch(len(todo), rng, enforce_clubs=False)[0]
+        return result
+
+    def count_matrix(self, assignment):
+        """Counts per player and group (players x groups) of sampled draws."""
+        n_players, n_groups = len(self.players), len(self.groups)
+        idx = np.arange(n_players) * n_groups + assignment.astype(np.int64)
+        return np.bincount(idx.ravel(), minlength=n_players * n_groups).reshape(n_players, n_groups)
+
+    def counts(self, n_draws, rng):
+        return self.count_matrix(self.sample(n_draws, rng))
+
+    def to_frame(self, matrix):
+        return pd.DataFrame(matrix, index=pd.Index(self.players, name="Player"), columns=self.groups)
@@ -0,0 +1,191 @@
+import argparse
+import os
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2
+
+from draw_model import FREE_SLOTS
+from mrv_sampler import MRVSampler
+from player_metadata import build_player_index
+from batch_tests import binom_pvalues
+from global_test import bh_adjust
+
+# Randomness test for pairs, triplets and quadruplets in the same group.
+# Observed and simulated draws use the same compact draw matrix as the MRVSampler:
+# one row per draw, one int8 column per player with the group index (-1 = not in the draw).
+# Members of every (draw, group) are stored in a padded array, every k-combination of
+# members gets an integer id, only the ids that occur are counted (np.unique).
+# Expected frequencies come from n_null valid draws of the MRVSampler (MRV heuristic,
+# not exactly uniform over the valid draws). The expectation is itself a Monte Carlo
+# count, so observed and simulated counts are compared with a two-sample test:
+# given both counts, the observed count is Binomial(total, draws / (draws + n_null)).
+
+
+def read_draws(paths):
+    """Parsed draws (columns File, Group, Club, Name, Seed) from Excel, Parquet or CSV files."""
+    frames = []
+    for path in paths:
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".parquet":
+            frames.append(pd.read_parquet(path))
+        elif ext == ".csv":
+            frames.append(pd.read_csv(path))
+        else:
+            frames.append(pd.read_excel(path))
+    return pd.concat(frames, ignore_index=True)
+
+
+def draw_matrix(df, players, groups):
+    """draws x players, group index or -1 if the player is not in the draw."""
+    draw_idx, draws = pd.factorize(df["File"].astype(str))
+    p_idx = pd.Index(players).get_indexer(df["Name"])
+    g_idx = pd.Index(groups).get_indexer(df["Group"])
+    keep = (p_idx >= 0) & (g_idx >= 0)
+    matrix = np.full((len(draws), len(players)), -1, dtype=np.int8)
+    matrix[draw_idx[keep], p_idx[keep]] = g_idx[keep]
+    return matrix
+
+
+def group_members(matrix, n_groups):
+    """Padded array draws x groups x max. group size with the player ids (ascending), -1 = empty."""
+    n_draws, n_players = matrix.shape
+    key = np.where(matrix < 0, n_groups, matrix).astype(np.int64)
+    order = np.argsort(key, axis=1, kind="stable")
+    sorted_groups = np.take_along_axis(key, order, axis=1)
+    sizes = np.zeros((n_draws, n_groups + 1), dtype=np.int64)
+    rows = np.repeat(np.arange(n_draws), n_players)
+    np.add.at(sizes, (rows, sorted_groups.ravel()), 1)
+    start = sizes.cumsum(axis=1) - sizes
+    pos = np.arange(n_players)[None, :] - np.take_along_axis(start, sorted_groups, axis=1)
+    width = max(int(sizes[:, :n_groups].max()), 1)
+    members = np.full((n_draws, n_groups + 1, width), -1, dtype=np.int64)
+    real = sorted_groups < n_groups
+    members[rows.reshape(n_draws, n_players)[real], sorted_groups[real], pos[real]] = order[real]
+    return members[:, :n_groups]
+
+
+def tuple_counts(members, k, n_players):
+    """(ids, counts) of the occurring k-combinations (id = base-n_players number of the sorted player ids)."""
+    all_codes, all_counts = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for combo in combinations(range(members.shape[-1]), k):
+        ids = members[..., combo]
+        valid = (ids >= 0).all(axis=-1)
+        codes = np.zeros(ids.shape[:-1], dtype=np.int64)
+        for j in range(k):
+            codes = codes * n_players + ids[..., j]
+        codes, counts = np.unique(codes[valid], return_counts=True)
+        all_codes.append(codes)
+        all_counts.append(counts)
+    codes, inverse = np.unique(np.concatenate(all_codes), return_inverse=True)
+    return codes, np.bincount(inverse, weights=np.concatenate(all_counts), minlength=len(codes)).astype(np.int64)
+
+
+def counts_of(codes, known_codes, known_counts):
+    """Counts for the sorted codes (a superset of known_codes), 0 if not known."""
+    counts = np.zeros(len(codes), dtype=np.int64)
+    counts[np.searchsorted(codes, known_codes)] = known_counts
+    return counts
+
+
+def decode(codes, k, n_players):
+    """codes -> array len(codes) x k of player ids."""
+    out = np.empty((len(codes), k), dtype=np.int64)
+    rest = codes.copy()
+    for j in range(k - 1, -1, -1):
+        out[:, j] = rest % n_players
+        rest //= n_players
+    return out
+
+
+def exposures(matrix, members_ids):
+    """Number of draws that contain all players of each combination."""
+    patterns, weights = np.unique(matrix >= 0, axis=0, return_counts=True)
+    present = patterns[:, members_ids].all(axis=-1)  # patterns x combinations
+    return weights @ present
+
+
+def test_combinations(matrix, null_matrix, k, players, groups):
+    """Observed vs expected counts of all k-combinations that occur or are possible."""
+    n_players, n_groups = len(players), len(groups)
+    obs_codes, obs_counts = tuple_counts(group_members(matrix, n_groups), k, n_players)
+    null_codes, null_counts = tuple_counts(group_members(null_matrix, n_groups), k, n_players)
+    codes = np.union1d(obs_codes, null_codes)
+    ids = decode(codes, k, n_players)
+
+    n = exposures(matrix, ids)
+    n_null = len(null_matrix)
+    obs = counts_of(codes, obs_codes, obs_counts)
+    null = counts_of(codes, null_codes, null_counts)
+    p0 = null / n_null
+    # two-sample test, p0 is a Monte Carlo estimate (every null draw contains all players)
+    p_values = binom_pvalues(obs, obs + null, n / (n + n_null))
+
+    result = pd.DataFrame({f"Player {j + 1}": np.asarray(players)[ids[:, j]] for j in range(k)})
+    result["Count"] = obs
+    result["Draws"] = n
+    result["Expected"] = n * p0
+    result["Null_probability"] = p0
+    result["Null_count"] = null
+    result["p_binom"] = p_values
+    result["q_fdr"] = bh_adjust(p_values)
+    return result.sort_values("p_binom", kind="stable").reset_index(drop=True)
+
+
+def dispersion(result, n_null, alpha=0.05):
+    """Global Chi² over all combinations with expected > 0. The counts are dependent,
+    so the Chi² p-value is only approximate, the dispersion (Chi²/df) is the main figure.
+    The expected counts are estimated from n_null draws, which adds the factor
+    (1 + draws / n_null) to the variance."""
+    possible = result["Expected"] > 0
+    exp = result.loc[possible, "Expected"]
+    var = exp * (1 + result.loc[possible, "Draws"] / n_null)
+    stat = float(((result.loc[possible, "Count"] - exp) ** 2 / var).sum())
+    df = max(int(possible.sum()) - 1, 1)
+    return {
+        "Combinations": len(result),
+        "Chi2": stat,
+        "df": df,
+        "Dispersion": stat / df,
+        "p_approx": chi2.sf(stat, df),
+        f"Significant (q < {alpha})": int((result["q_fdr"] < alpha).sum()),
+        "Observed but impossible": int(((result["Count"] > 0) & ~possible).sum()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test pairs, triplets and quadruplets against random draws.")
+    parser.add_argument("input_files", nargs="*", default=[r"D:\Maturaarbeit\all_MS_U13_parts\all_MS_U13.xlsx"],
+                        help="Parsed draws (Excel, Parquet or CSV)")
+    parser.add_argument("--output", default=r"D:\Maturaarbeit\analysis_results\pair_test.xlsx")
+    parser.add_argument("--n_null", type=int, default=200_000, help="Simulated draws for the expected frequencies")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    groups = list(FREE_SLOTS)
+    df = read_draws(args.input_files)
+    index = build_player_index(df.assign(Count=1), groups)
+    players = list(index.index)
+
+    matrix = draw_matrix(df, players, groups)
+    sampler = MRVSampler(index["Seed"].to_dict(), dict(FREE_SLOTS), index["Club"].to_dict())
+    null_matrix = sampler.sample(args.n_null, np.random.default_rng(args.seed))
+    print(f"{len(matrix)} draws, {len(players)} players, {args.n_null} simulated draws")
+
+    sheets, summary = {}, []
+    for k, name in [(2, "Pairs"), (3, "Triplets"), (4, "Quadruplets")]:
+        sheets[name] = test_combinations(matrix, null_matrix, k, players, groups)
+        summary.append({"Size": k, **dispersion(sheets[name], args.n_null)})
+        print(f"{name}: dispersion {summary[-1]['Dispersion']:.3f}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with pd.ExcelWriter(args.output, engine="openpyxl") as writer:
+        pd.DataFrame(summary).to_excel(writer, sheet_name="Summary", index=False)
+        for name, result in sheets.items():
+            result.to_excel(writer, sheet_name=name, index=False)
+    print(f"Saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
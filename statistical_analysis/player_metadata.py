@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from draw_model import parser_seed
+
+# Player index of one evaluation: Seed, Club, Total and the observed count per group.
+# Built in one groupby pass over the "Chi2 preparation" sheet and cached next to the
+# evaluation as ".<name>.players.json", keyed by the file that holds the sheet (size and
+# mtime, sha256 of that file if only the mtime changed, like parse_manifest.classify).
+# An unchanged evaluation is therefore not read again, the other sheets are never read.
+
+CACHE_VERSION = 2
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _source_unchanged(cached, sheet_file):
+    """True if sheet_file is the cached source; a touched file (same content) gets its new mtime."""
+    source = cached.get("source", {})
+    stat = os.stat(sheet_file)
+    if source.get("file") != os.path.basename(sheet_file) or source.get("size") != stat.st_size:
+        return False
+    if source.get("mtime_ns") == stat.st_mtime_ns:
+        return True
+    if source.get("sha256") == file_sha256(sheet_file):
+        source["mtime_ns"] = stat.st_mtime_ns
+        return True
+    return False
+
+
+def build_player_index(df_all, groups):
+    """One pass over the sheet: Name -> Seed, Club, Total, count per group."""
+    counts = (
+        df_all.groupby(["Name", "Group"])["Count"].sum()
+        .unstack(fill_value=0)
+        .reindex(columns=groups, fill_value=0)
+    )
+    totals = df_all.groupby("Name")["Count"].sum()
+
+    # first seed that appears for the player
+    seeds = df_all.dropna(subset=["Seed"]).groupby("Name", sort=False)["Seed"].first()
+
+    # most frequent club (ties: alphabetical, like Series.mode())
+    club_counts = df_all.dropna(subset=["Club"]).groupby(["Name", "Club"]).size().reset_index(name="n")
+    club_counts = club_counts.sort_values(["Name", "n", "Club"], ascending=[True, False, True])
+    club = club_counts.drop_duplicates("Name").set_index("Name")["Club"]
+
+    index = pd.DataFrame(index=counts.index)
+    index["Seed"] = pd.Series([parser_seed(seeds.get(n)) for n in index.index], index=index.index, dtype=object)
+    index["Club"] = club.reindex(index.index).fillna("UNKNOWN")
+    index["Total"] = totals.reindex(index.index).astype(int)
+    return pd.concat([index, counts], axis=1)
+
+
+def cache_path(path):
+    name = os.path.basename(os.path.normpath(path))
+    return os.path.join(os.path.dirname(os.path.normpath(path)), f".{name}.players.json")
+
+
+def _from_records(records, groups):
+    index = pd.DataFrame(records).set_index("Name")
+    index["Seed"] = pd.Series([r["Seed"] for r in records], index=index.index, dtype=object)
+    return index[["Seed", "Club", "Total"] + list(groups)]
+
+
+def load_player_index(path, groups, read_sheet, sheet_file):
+    """Player index of an evaluation, from the cache if the evaluation is unchanged.
+    read_sheet(path) must return the "Chi2 preparation" sheet, sheet_file is the file holding it."""
+    cache = cache_path(path)
+    if os.path.isfile(cache):
+        try:
+            with open(cache, encoding="utf-8") as f:
+                cached = json.load(f)
+            mtime_ns = cached.get("source", {}).get("mtime_ns")
+            if (cached.get("version") == CACHE_VERSION and cached.get("groups") == list(groups)
+                    and _source_unchanged(cached, sheet_file)):
+                if cached["source"]["mtime_ns"] != mtime_ns:
+                    _write_cache(cache, cached)  # touched file, keep its new mtime
+                return _from_records(cached["players"], groups)
+        except (OSError, ValueError, KeyError):
+            pass  # broken cache -> rebuild
+
+    stat = os.stat(sheet_file)
+    source = {"file": os.path.basename(sheet_file), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+              "sha256": file_sha256(sheet_file)}
+    index = build_player_index(read_sheet(path), groups)
+    records = [
+        {"Name": name, "Seed": row["Seed"], "Club": row["Club"], "Total": int(row["Total"]),
+         **{g: int(row[g]) for g in groups}}
+        for name, row in index.iterrows()
+    ]
+    _write_cache(cache, {"version": CACHE_VERSION, "source": source, "groups": list(groups), "players": records})
+    return index
+
+
+def _write_cache(cache, content):
+    with open(cache, "w", encoding="utf-8") as f:
+        json.dump(content, f)
@@ -6,6 +6,7 @@ import glob
 import os
 from pathlib import Path
 from tqdm import tqdm
+from evaluation_store import write_evaluation
 
 
 
@@ -56,11 +57,15 @@ def count_combinations(df, k: int):
 # Check if there are further, unused combinations
 def find_never_together(df, pair_counter):
     player_draws = {p: set(sub["draw_nr"].dropna()) for p, sub in df.groupby("Name")}
-    all_players = sorted(df["Name"].dropna().unique())
+    infos = df.drop_duplicates(subset="Name")[["Name","Seed","Club"]].set_index("Name")
+    return never_together_frame(player_draws, infos, set(pair_counter.keys()))
+
+
+def never_together_frame(player_draws, infos, observed_pairs):
+    """player_draws: {player: set of draw numbers}, infos: Seed and Club per player (index Name)"""
+    all_players = sorted(player_draws)
     all_combos = set(combinations(all_players, 2))
-    observed_pairs = set(pair_counter.keys())
     never_together = []
-    infos = df.drop_duplicates(subset="Name")[["Name","Seed","Club"]].set_index("Name")
 
     for a,b in all_combos:
         if player_draws[a] & player_draws[b]:  # were in same draw at least once
@@ -77,101 +82,101 @@ def find_never_together(df, pair_counter):
     return pd.DataFrame(never_together)
 
 
+# Combinations of k players as DataFrame (most frequent first)
+def combination_frame(tracker, k):
+    players = [f"Player {i}" for i in range(1, k + 1)]
+    df = pd.DataFrame([
+        {**dict(zip(players, combo)),
+        "Count": len(draws),
+        "Max consecutive": longest_consecutive_run(draws),
+        "Draw numbers": format_draw_display(draws)
+        }
+        for combo, draws in tracker.items()
+    ], columns=players + ["Count", "Max consecutive", "Draw numbers"])
+    return df.sort_values(by="Count", ascending=False)
+
+
+# Draw number from the File column ("1" for Ausl_1.xlsx, "Draw_12_..." -> 12)
+def draw_numbers(files):
+    return pd.to_numeric(
+        files.astype(str)
+            .map(lambda p: Path(p).stem)
+            .str.extract(r"(\d+)", expand=False),
+        errors="coerce"
+    ).astype("Int64")
+
+
+def evaluation_sheets(dist, pair_counter, triplet_counter, quadruplets_counter, never_df, dist_chi_test):
+    """(sheet name, DataFrame, index) of an evaluation, see evaluation_store.write_evaluation"""
+    return [
+        ("Group distribution", dist, True),
+        ("Pairs of 2", combination_frame(pair_counter, 2), False),
+        ("Never together", never_df, False),
+        ("Triplets", combination_frame(triplet_counter, 3), False),
+        ("Quadruplets", combination_frame(quadruplets_counter, 4), False),
+        ("Chi2 preparation", dist_chi_test, False),
+    ]
 
 
 input_folder = r"D:\Maturaarbeit\all_MS_U13_parts"
 output_folder = r"D:\Maturaarbeit\evaluations"
-os.makedirs(output_folder, exist_ok=True)
+
+# Output format of the evaluation sheets: "parquet" or "csv"
+# EXPORT_EXCEL additionally writes the old Excel workbook (slow for big runs)
+OUTPUT_FORMAT = "parquet"
+EXPORT_EXCEL = False
 
 def natkey(s): 
     return [int(t) if t.isdigit() else t for t in re.split(r'(\d+)', s)]
 
-excel_files = sorted(glob.glob(os.path.join(input_folder, "*.xlsx")), key=natkey)
+def read_draws(path):
+    return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_excel(path)
 
 
+def main():
+    os.makedirs(output_folder, exist_ok=True)
 
+    # Parsed draws from draw_parser.py: Parquet (default) or Excel,
+    # an Excel file with the same name as a Parquet file is only an export and skipped
+    parquet_files = glob.glob(os.path.join(input_folder, "*.parquet"))
+    parquet_names = {Path(p).stem for p in parquet_files}
+    draw_files = sorted(parquet_files + [p for p in glob.glob(os.path.join(input_folder, "*.xlsx"))
+                                         if Path(p).stem not in parquet_names], key=natkey)
 
-# Main loop
-for file in tqdm(excel_files, desc="Processing files", ncols=100):
-    base_name = os.path.basename(file)
-    tqdm.write(f"Processing file: {base_name}")
+    # Main loop
+    for file in tqdm(draw_files, desc="Processing files", ncols=100):
+        base_name = os.path.basename(file)
+        tqdm.write(f"Processing file: {base_name}")
 
-    # Load prepared Excel
-    df = pd.read_excel(file)
+        # Load parsed draws
+        df = read_draws(file)
 
-    # Extract draw number
-    df["draw_nr"] = pd.to_numeric(
-        df["File"].astype(str)
-                .map(lambda p: Path(p).stem)           
-                .str.extract(r"(\d+)", expand=False), 
-        errors="coerce"
-    ).astype("Int64")
+        # Extract draw number
+        df["draw_nr"] = draw_numbers(df["File"])
 
-    if df["draw_nr"].isna().any():
-        raise ValueError(
-            f"draw_nr could not be extracet in all files: {file}"
-        )
+        if df["draw_nr"].isna().any():
+            raise ValueError(
+                f"draw_nr could not be extracet in all files: {file}"
+            )
 
-    dist = group_distribution(df)
-    pair_counter = count_combinations(df, 2)
-    triplet_counter = count_combinations(df, 3)
-    quadruplets_counter = count_combinations(df, 4)
-    never_df = find_never_together(df, pair_counter)
+        dist = group_distribution(df)
+        pair_counter = count_combinations(df, 2)
+        triplet_counter = count_combinations(df, 3)
+        quadruplets_counter = count_combinations(df, 4)
+        never_df = find_never_together(df, pair_counter)
 
-    dist_chi_test = group_distribution_for_chi_test(df)
+        dist_chi_test = group_distribution_for_chi_test(df)
 
-    # Convert pairs of 2 into DataFrame
-    pair_df = pd.DataFrame([
-        {"Player 1": a,
-        "Player 2": b,
-        "Count": len(draws),
-        "Max consecutive": longest_consecutive_run(draws),
-        "Draw numbers": format_draw_display(draws)
-        }
-        for (a, b), draws in pair_counter.items()
-    ])
-    pair_df = pair_df.sort_values(by="Count", ascending=False)
-
-    # Convert triplets into DataFrame
-    triplet_df = pd.DataFrame([
-        {
-            "Player 1": a,
-            "Player 2": b,
-            "Player 3": c,
-            "Count": len(draws),
-            "Max consecutive": longest_consecutive_run(draws),
-            "Draw numbers": format_draw_display(draws)
-        }
-        for (a, b, c), draws in triplet_counter.items()
-    ])
-    triplet_df = triplet_df.sort_values(by="Count", ascending=False)
-
-    # Convert quadruplets into DataFrame
-    quadruplet_df = pd.DataFrame([
-        {
-            "Player 1": a,
-            "Player 2": b,
-            "Player 3": c,
-            "Player 4": d,
-            "Count": len(draws),
-            "Max consecutive": longest_consecutive_run(draws),
-            "Draw numbers": format_draw_display(draws)
+        base_name = os.path.splitext(os.path.basename(file))[0]
+        output_base = os.path.join(output_folder, f"evaluation_{base_name}")
 
-        }
-        for (a, b, c, d), draws in quadruplets_counter.items()
-    ])
-    quadruplet_df = quadruplet_df.sort_values(by="Count", ascending=False)
-
-    base_name = os.path.splitext(os.path.basename(file))[0]
-    output_file = os.path.join(output_folder, f"evaluation_{base_name}.xlsx")
-
-    # Create new Excel
-    with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
-        dist.to_excel(writer, sheet_name="Group distribution")
-        pair_df.to_excel(writer, sheet_name="Pairs of 2", index=False)
-        never_df.to_excel(writer, sheet_name="Never together", index=False)
-        triplet_df.to_excel(writer, sheet_name="Triplets", index=False)
-        quadruplet_df.to_excel(writer, sheet_name="Quadruplets", index=False)
-        dist_chi_test.to_excel(writer, sheet_name="Chi2 preparation", index=False)
-
-print("Done")
\ No newline at end of file
+        # Write all sheets (Parquet/CSV, optional Excel export)
+        write_evaluation(evaluation_sheets(dist, pair_counter, triplet_counter, quadruplets_counter,
+                                           never_df, dist_chi_test),
+                         output_base, fmt=OUTPUT_FORMAT, excel=EXPORT_EXCEL)
+
+    print("Done")
+
+
+if __name__ == "__main__":
+    main()
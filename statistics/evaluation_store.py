@@ -0,0 +1,149 @@
+import glob
+import json
+import os
+import re
+
+import pandas as pd
+
+# Output layer for the evaluation sheets of draw_statistics.py.
+# Default: one folder "evaluation_<name>" with one Parquet (or CSV) file per sheet
+# and a small sheets.json describing the order, file names and index columns.
+# The Excel workbook is only an optional export. Sheets that are longer than the
+# Excel row limit are split into "<sheet> (2)", "<sheet> (3)", ...
+
+EXCEL_MAX_ROWS = 1_048_576  # incl. header row
+EXCEL_MAX_SHEET_NAME = 31
+MANIFEST_NAME = "sheets.json"
+FORMATS = ("parquet", "csv")
+
+
+def sheet_slug(sheet_name):
+    return re.sub(r"[^0-9A-Za-z]+", "_", sheet_name).strip("_").lower()
+
+
+def write_evaluation(sheets, output_base, fmt="parquet", excel=False):
+    """sheets: list of (sheet_name, DataFrame, write_index)
+    output_base: path without extension, e.g. ".../evaluation_all_MS_U13"
+    Returns the list of written paths."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format '{fmt}', choose one of {FORMATS}")
+
+    os.makedirs(output_base, exist_ok=True)
+    manifest = []
+    written = []
+
+    for sheet_name, df, write_index in sheets:
+        index_cols = []
+        if write_index:
+            index_cols = [n if n is not None else "index" for n in df.index.names]
+            df = df.rename_axis(index_cols).reset_index()
+        file_name = f"{sheet_slug(sheet_name)}.{fmt}"
+        path = os.path.join(output_base, file_name)
+        if fmt == "parquet":
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+        manifest.append({"sheet": sheet_name, "file": file_name, "index": index_cols})
+        written.append(path)
+
+    with open(os.path.join(output_base, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump({"format": fmt, "sheets": manifest}, f, indent=2)
+
+    if excel:
+        written.append(write_excel(sheets, output_base + ".xlsx"))
+    return written
+
+
+def split_sheet_names(sheet_name, n_parts):
+    names = [sheet_name[:EXCEL_MAX_SHEET_NAME]]
+    for i in range(2, n_parts + 1):
+        suffix = f" ({i})"
+        names.append(sheet_name[:EXCEL_MAX_SHEET_NAME - len(suffix)] + suffix)
+    return names
+
+
+def write_excel(sheets, output_file):
+    """Excel export. Uses xlsxwriter if available (faster), otherwise openpyxl.
+    Sheets above the row limit are split.
+    No constant-memory mode: pandas writes column by column, which that mode does not support."""
+    try:
+        import xlsxwriter  # noqa: F401
+        writer = pd.ExcelWriter(output_file, engine="xlsxwriter")
+    except ImportError:
+        writer = pd.ExcelWriter(output_file, engine="openpyxl")
+
+    max_data_rows = EXCEL_MAX_ROWS - 1
+    with writer:
+        for sheet_name, df, write_index in sheets:
+            if write_index:
+                df = df.reset_index()
+            n_parts = max(1, -(-len(df) // max_data_rows))
+            for i, name in enumerate(split_sheet_names(sheet_name, n_parts)):
+                part = df.iloc[i * max_data_rows:(i + 1) * max_data_rows]
+                part.to_excel(writer, sheet_name=name, index=False)
+    return output_file
+
+
+def read_manifest(dataset_dir):
+    with open(os.path.join(dataset_dir, MANIFEST_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_evaluation_dataset(path):
+    return os.path.isdir(path) and os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+def _sheet_entry(path, sheet_name):
+    manifest = read_manifest(path)
+    entry = next((s for s in manifest["sheets"] if s["sheet"] == sheet_name), None)
+    if entry is None:
+        raise KeyError(f"Sheet '{sheet_name}' not found in {path}")
+    return entry
+
+
+def evaluation_sheet_file(path, sheet_name):
+    """File that holds one sheet: its Parquet/CSV file in an evaluation folder, else the workbook."""
+    if is_evaluation_dataset(path):
+        return os.path.join(path, _sheet_entry(path, sheet_name)["file"])
+    return path
+
+
+def read_evaluation_sheet(path, sheet_name):
+    """Read one sheet from an evaluation folder (Parquet/CSV) or an Excel workbook.
+    Split Excel sheets ("<sheet> (2)", ...) are joined again."""
+    if is_evaluation_dataset(path):
+        entry = _sheet_entry(path, sheet_name)
+        file_path = os.path.join(path, entry["file"])
+        if file_path.endswith(".parquet"):
+            df = pd.read_parquet(file_path)
+        else:
+            df = pd.read_csv(file_path)
+        if entry["index"]:
+            df = df.set_index(entry["index"])
+        return df
+
+    xls = pd.ExcelFile(path)
+    parts = []
+    for name in split_sheet_names(sheet_name, len(xls.sheet_names)):
+        if name not in xls.sheet_names:
+            break
+        parts.append(name)
+    if not parts:
+        raise KeyError(f"Sheet '{sheet_name}' not found in {path}")
+    frames = [pd.read_excel(xls, sheet_name=s) for s in parts]
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def evaluation_name(path):
+    name = os.path.basename(os.path.normpath(path))
+    return os.path.splitext(name)[0] if not os.path.isdir(path) else name
+
+
+def find_evaluations(folder, sort_key=None):
+    """All evaluations in a folder. If both the fast format and the Excel
+    export exist for the same evaluation, the fast format is used."""
+    datasets = [p for p in glob.glob(os.path.join(folder, "*")) if is_evaluation_dataset(p)]
+    names = {evaluation_name(p) for p in datasets}
+    workbooks = [p for p in glob.glob(os.path.join(folder, "*.xlsx"))
+                 if evaluation_name(p) not in names and not os.path.basename(p).startswith("~$")]
+    return sorted(datasets + workbooks, key=sort_key)
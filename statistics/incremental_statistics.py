@@ -0,0 +1,76 @@
+from collections import Counter, defaultdict
+from itertools import combinations
+
+import pandas as pd
+
+from draw_statistics import draw_numbers, evaluation_sheets, never_together_frame
+from evaluation_store import write_evaluation
+
+# Evaluation of draw_statistics.py, updated draw by draw (live pipeline).
+# Only counters are kept (group counts, Chi² counts, draw numbers per combination,
+# draws per player), a new draw updates them in O(players in the draw).
+# sheets() gives the same sheets as draw_statistics.py for the draws added so far.
+
+COMBINATION_SIZES = (2, 3, 4)
+
+
+def _key(value):
+    return None if pd.isna(value) else value
+
+
+class IncrementalEvaluation:
+
+    def __init__(self):
+        self.draws = set()
+        self.group_counts = Counter()  # (Group, Name)
+        self.chi_counts = Counter()  # (Group, Name, Seed, Club)
+        self.trackers = {k: defaultdict(list) for k in COMBINATION_SIZES}
+        self.player_draws = defaultdict(set)
+        self.infos = {}  # Name -> (Seed, Club) of the first appearance
+
+    def add_draw(self, df):
+        """Adds the parsed rows of one draw (File, Group, Club, Name, Seed).
+        Returns False if the draw was already added."""
+        draw_nr = draw_numbers(df["File"]).iat[0]
+        if pd.isna(draw_nr):
+            raise ValueError(f"draw_nr could not be extracted: {df['File'].iat[0]}")
+        draw_nr = int(draw_nr)
+        if draw_nr in self.draws:
+            return False
+        self.draws.add(draw_nr)
+
+        for group, name, seed, club in zip(df["Group"], df["Name"], df["Seed"], df["Club"]):
+            self.chi_counts[(group, name, _key(seed), _key(club))] += 1
+            if pd.isna(name):
+                continue
+            self.group_counts[(group, name)] += 1
+            self.player_draws[name].add(draw_nr)
+            self.infos.setdefault(name, (_key(seed), _key(club)))
+
+        for _, g in df.groupby("Group"):
+            players = sorted(p for p in g["Name"] if pd.notna(p))
+            for k, tracker in self.trackers.items():
+                for combo in combinations(players, k):
+                    tracker[combo].append(draw_nr)
+        return True
+
+    def add_draws(self, df):
+        """Adds several draws (rows of many files), returns the number of new draws."""
+        return sum(self.add_draw(sub) for _, sub in df.groupby("File", sort=False))
+
+    def sheets(self):
+        """(sheet name, DataFrame, index) like draw_statistics.py"""
+        counts = pd.Series(self.group_counts, dtype="int64")
+        counts.index.names = ["Group", "Name"]
+        dist = counts.sort_index().unstack(fill_value=0)
+
+        chi = pd.DataFrame([(*key, n) for key, n in self.chi_counts.items()],
+                           columns=["Group", "Name", "Seed", "Club", "Count"])
+        dist_chi_test = chi.groupby(["Group", "Name", "Seed", "Club"], dropna=False)["Count"].sum().reset_index()
+
+        infos = pd.DataFrame.from_dict(self.infos, orient="index", columns=["Seed", "Club"])
+        never_df = never_together_frame(self.player_draws, infos, set(self.trackers[2]))
+        return evaluation_sheets(dist, self.trackers[2], self.trackers[3], self.trackers[4], never_df, dist_chi_test)
+
+    def write(self, output_base, fmt="parquet", excel=False):
+        write_evaluation(self.sheets(), output_base, fmt=fmt, excel=excel)
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import shutil
+
+import pandas as pd
+
+from evaluation_store import is_evaluation_dataset, read_evaluation_sheet, read_manifest, sheet_slug, \
+    split_sheet_names
+
+# Cache for Excel workbooks that are read again and again (heatmaps, summaries).
+# - Sheet discovery only reads the header row of every sheet (openpyxl read-only).
+# - Every sheet is parsed once and stored as Parquet (Pickle if a column cannot be
+#   written to Parquet, e.g. mixed numbers and text) in ".workbook_cache/<file>/".
+# - The cache is valid as long as size and modification time match. If only the
+#   modification time changed, the sha256 of the file decides.
+# Evaluation folders of draw_statistics.py are already columnar and are read directly.
+
+CACHE_DIR_NAME = ".workbook_cache"
+CACHE_VERSION = 1
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_dir(path):
+    path = os.path.abspath(path)
+    return os.path.join(os.path.dirname(path), CACHE_DIR_NAME, os.path.basename(path))
+
+
+def _scan_headers(path):
+    """Header row of every sheet, without reading the data."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True)
+    try:
+        return {ws.title: [c for c in next(ws.iter_rows(max_row=1, values_only=True), ()) if c is not None]
+                for ws in wb.worksheets}
+    finally:
+        wb.close()
+
+
+def _write_manifest(directory, manifest):
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def _manifest(path):
+    """Valid cache manifest of a workbook, rebuilt if the workbook changed."""
+    directory = cache_dir(path)
+    stat = os.stat(path)
+    manifest = None
+    try:
+        with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    if manifest and manifest.get("version") == CACHE_VERSION:
+        if manifest["size"] == stat.st_size and manifest["mtime_ns"] == stat.st_mtime_ns:
+            return manifest
+        # touched but maybe unchanged
+        if manifest["size"] == stat.st_size and manifest["sha256"] == file_hash(path):
+            manifest["mtime_ns"] = stat.st_mtime_ns
+            _write_manifest(directory, manifest)
+            return manifest
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    manifest = {
+        "version": CACHE_VERSION,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": file_hash(path),
+        "sheets": {name: {"columns": [str(c) for c in cols], "file": None}
+                   for name, cols in _scan_headers(path).items()},
+    }
+    _write_manifest(directory, manifest)
+    return manifest
+
+
+def sheet_columns(path):
+    """{sheet name: column names} of a workbook or an evaluation folder."""
+    if is_evaluation_dataset(path):
+        columns = {}
+        for entry in read_manifest(path)["sheets"]:
+            file_path = os.path.join(path, entry["file"])
+            if file_path.endswith(".parquet"):
+                import pyarrow.parquet as pq
+                names = pq.read_schema(file_path).names
+            else:
+                names = list(pd.read_csv(file_path, nrows=0).columns)
+            columns[entry["sheet"]] = names
+        return columns
+    return {name: entry["columns"] for name, entry in _manifest(path)["sheets"].items()}
+
+
+def find_sheet(path, required_cols):
+    """Last sheet that contains all required columns."""
+    for name, cols in reversed(list(sheet_columns(path).items())):
+        if set(required_cols).issubset(cols):
+            return name
+    raise ValueError(f"No sheet found containing required columns: {set(required_cols)}")
+
+
+def _read_cached(path, manifest, sheet_name):
+    directory = cache_dir(path)
+    entry = manifest["sheets"][sheet_name]
+    if entry["file"]:
+        file_path = os.path.join(directory, entry["file"])
+        if os.path.isfile(file_path):
+            if file_path.endswith(".parquet"):
+                return pd.read_parquet(file_path)
+            return pd.read_pickle(file_path)
+
+    df = pd.read_excel(path, sheet_name=sheet_name)
+    slug = sheet_slug(sheet_name) or "sheet"
+    try:
+        entry["file"] = f"{slug}.parquet"
+        df.to_parquet(os.path.join(directory, entry["file"]), index=False)
+    except (ImportError, ValueError, TypeError):
+        entry["file"] = f"{slug}.pkl"
+        df.to_pickle(os.path.join(directory, entry["file"]))
+    _write_manifest(directory, manifest)
+    return df
+
+
+def read_sheet(path, sheet_name=None):
+    """One sheet (default: the first one) of a workbook or an evaluation folder.
+    Split Excel sheets ("<sheet> (2)", ...) are joined again."""
+    if is_evaluation_dataset(path):
+        if sheet_name is None:
+            sheet_name = read_manifest(path)["sheets"][0]["sheet"]
+        return read_evaluation_sheet(path, sheet_name)
+
+    manifest = _manifest(path)
+    names = list(manifest["sheets"])
+    if sheet_name is None:
+        sheet_name = names[0]
+    parts = [n for n in split_sheet_names(sheet_name, len(names)) if n in manifest["sheets"]]
+    if not parts:
+        raise KeyError(f"Sheet '{sheet_name}' not found in {path}")
+    frames = [_read_cached(path, manifest, name) for name in parts]
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def read_sheet_with(path, required_cols):
+    """(sheet name, DataFrame) of the last sheet that contains all required columns."""
+    sheet_name = find_sheet(path, required_cols)
+    return sheet_name, read_sheet(path, sheet_name)